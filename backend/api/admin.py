@@ -1,7 +1,7 @@
 from django.conf import settings
 from django.contrib import admin
 
-from api.models import Favorite, Purchase, Subscriber
+from api.models import Favorite, Purchase, ShoppingListItem, Subscriber
 
 EMPTY_VALUE = settings.EMPTY_VALUE
 
@@ -43,3 +43,16 @@ class SubscribeAdmin(admin.ModelAdmin):
         'user',
     )
     empty_value_display = EMPTY_VALUE
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = (
+        'user',
+        'ingredient',
+        'total_amount'
+    )
+    search_fields = (
+        'user',
+    )
+    empty_value_display = EMPTY_VALUE
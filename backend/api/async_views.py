@@ -0,0 +1,124 @@
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, JsonResponse
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from api import shopping_list
+from api.views import (
+    FavoriteViewSet,
+    FollowApiView,
+    PurchaseViewSet,
+    get_purchase_list,
+    shopping_list_response,
+    unsupported_format
+)
+
+
+def json_response(data, status):
+    if data is None:
+        return HttpResponse(status=status)
+    return JsonResponse(
+        data,
+        status=status,
+        safe=False,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}
+    )
+
+
+def error_response(exc):
+    if isinstance(exc, Http404):
+        exc = exceptions.NotFound()
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {'detail': exc.detail}
+    response = json_response(data, exc.status_code)
+    if isinstance(exc, exceptions.NotAuthenticated):
+        response['WWW-Authenticate'] = 'Token'
+    return response
+
+
+def authenticate(request):
+    drf_request = Request(request, authenticators=[
+        authenticator()
+        for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    ])
+    if not drf_request.user.is_authenticated:
+        raise exceptions.NotAuthenticated()
+    return drf_request.user
+
+
+def async_api_view(methods):
+    def decorator(func):
+        @wraps(func)
+        async def view(request, *args, **kwargs):
+            if request.method not in methods:
+                return error_response(
+                    exceptions.MethodNotAllowed(request.method)
+                )
+            try:
+                request.user = await sync_to_async(authenticate)(request)
+                return await func(request, *args, **kwargs)
+            except (exceptions.APIException, Http404) as exc:
+                return error_response(exc)
+        view.csrf_exempt = True
+        return view
+    return decorator
+
+
+def toggle_view(viewset_class):
+    @async_api_view(['POST', 'DELETE'])
+    async def view(request, recipes_id):
+        viewset = viewset_class()
+        method = viewset.add if request.method == 'POST' else viewset.remove
+        return json_response(
+            *await sync_to_async(method)(request.user, recipes_id)
+        )
+    return view
+
+
+def bulk_view(viewset_class):
+    @async_api_view(['POST', 'DELETE'])
+    async def view(request):
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise exceptions.ParseError()
+        viewset = viewset_class()
+        recipe_ids = viewset.recipe_ids(data)
+        if request.method == 'POST':
+            method = viewset.add_many
+        else:
+            method = viewset.remove_many
+        return json_response(
+            *await sync_to_async(method)(request.user, recipe_ids)
+        )
+    return view
+
+
+favorite = toggle_view(FavoriteViewSet)
+shopping_cart = toggle_view(PurchaseViewSet)
+favorite_bulk = bulk_view(FavoriteViewSet)
+shopping_cart_bulk = bulk_view(PurchaseViewSet)
+
+
+@async_api_view(['POST', 'DELETE'])
+async def subscribe(request, users_id):
+    if request.method == 'POST':
+        method = FollowApiView.follow
+    else:
+        method = FollowApiView.unfollow
+    return json_response(*await sync_to_async(method)(request, users_id))
+
+
+@async_api_view(['GET'])
+async def download_cart(request):
+    export_format = request.GET.get('format', shopping_list.DEFAULT_FORMAT)
+    if export_format not in shopping_list.FORMATS:
+        return json_response(unsupported_format(export_format), 400)
+    items = await sync_to_async(list)(get_purchase_list(request.user))
+    return shopping_list_response(export_format, iter(items))
@@ -0,0 +1,6 @@
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+
+def change_counter(queryset, field, delta):
+    return queryset.update(**{field: Greatest(F(field) + delta, 0)})
@@ -0,0 +1,285 @@
+import json
+from base64 import b64encode
+from io import BytesIO
+from math import ceil
+from time import perf_counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from api.models import Favorite, Purchase, Subscriber
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+PERCENTILES = (50, 95, 99)
+BULK_SIZE = 10
+
+
+class Rollback(Exception):
+    pass
+
+
+def percentile(values, rank):
+    values = sorted(values)
+    return values[max(ceil(rank / 100 * len(values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер задержек и числа SQL-запросов для эндпоинтов API '
+        'и сравнение с сохранённым эталоном.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Записать результаты как новый эталон.'
+        )
+        parser.add_argument(
+            '--latency-threshold',
+            type=float,
+            default=0.5,
+            help='Допустимый относительный рост p95 (0.5 = +50%%).'
+        )
+
+    @staticmethod
+    def get_cases(user):
+        own = Recipe.objects.filter(author=user).first()
+        if own is None:
+            raise CommandError(f'У пользователя {user} нет рецептов.')
+        recipe = Recipe.objects.exclude(author=user).order_by('id').first()
+        not_favorited = Recipe.objects.exclude(favorite__user=user).first()
+        favorited = Favorite.objects.filter(user=user).first()
+        not_in_cart = Recipe.objects.exclude(purchase__user=user).first()
+        in_cart = Purchase.objects.filter(user=user).first()
+        not_followed = User.objects.exclude(author__user=user).exclude(
+            id=user.id
+        ).first()
+        followed = Subscriber.objects.filter(user=user).first()
+        tag = Tag.objects.first()
+        ingredients = list(
+            Ingredient.objects.values_list('id', flat=True)[:8]
+        )
+        recipe_payload = {
+            'name': 'Замер',
+            'text': 'Замер',
+            'cooking_time': 10,
+            'tags': [tag.id],
+            'ingredients': [
+                {'id': pk, 'amount': 10} for pk in ingredients
+            ],
+        }
+        image = BytesIO()
+        Image.new('RGB', (64, 48), '#49B64E').save(image, 'PNG')
+        create_payload = dict(
+            recipe_payload,
+            image='data:image/png;base64,'
+            + b64encode(image.getvalue()).decode()
+        )
+        recipes = reverse('api:recipes:recipes-list')
+        cases = [
+            ('recipes-list', 'get', recipes, None, True),
+            ('recipes-list:anonymous', 'get', recipes, None, False),
+            ('recipes-list:tags', 'get', f'{recipes}?tags={tag.slug}',
+             None, True),
+            ('recipes-list:favorited', 'get', f'{recipes}?is_favorited=1',
+             None, True),
+            ('recipes-list:cart', 'get', f'{recipes}?is_in_shopping_cart=1',
+             None, True),
+            ('recipes-list:cursor', 'get', f'{recipes}?pagination=cursor',
+             None, True),
+            ('recipes-list:search', 'get', f'{recipes}?search=рецепт',
+             None, True),
+            ('recipes-detail', 'get',
+             reverse('api:recipes:recipes-detail', args=[recipe.id]),
+             None, True),
+            ('recipes-create', 'post', recipes, create_payload, True),
+            ('recipes-update', 'patch',
+             reverse('api:recipes:recipes-detail', args=[own.id]),
+             recipe_payload, True),
+            ('recipes-delete', 'delete',
+             reverse('api:recipes:recipes-detail', args=[own.id]),
+             None, True),
+            ('tags-list', 'get', reverse('api:recipes:tags-list'),
+             None, False),
+            ('ingredients-list', 'get',
+             f'{reverse("api:recipes:ingredients-list")}?name=са',
+             None, False),
+            ('users-list', 'get', reverse('api:user-list'), None, True),
+            ('users-me', 'get', reverse('api:user-me'), None, True),
+            ('subscriptions', 'get',
+             f'{reverse("api:subscriptions")}?recipes_limit=3', None, True),
+            ('download', 'get', reverse('api:download'), None, True),
+        ]
+        if not_followed is not None:
+            cases.append(('subscribe', 'post', reverse(
+                'api:subscribe', args=[not_followed.id]
+            ), None, True))
+        if followed is not None:
+            cases.append(('unsubscribe', 'delete', reverse(
+                'api:subscribe', args=[followed.author_id]
+            ), None, True))
+        for name, url_name, target, model in (
+            ('favorite', 'favorite', not_favorited, None),
+            ('unfavorite', 'favorite', favorited, Favorite),
+            ('cart', 'cart', not_in_cart, None),
+            ('uncart', 'cart', in_cart, Purchase),
+        ):
+            if target is None:
+                continue
+            recipe_id = target.id if model is None else target.recipe_id
+            cases.append((
+                name,
+                'post' if model is None else 'delete',
+                reverse(f'api:{url_name}', args=[recipe_id]),
+                None,
+                True
+            ))
+        for name, url_name, model, relation in (
+            ('favorite', 'favorite-bulk', Favorite, 'favorite'),
+            ('cart', 'cart-bulk', Purchase, 'purchase'),
+        ):
+            added = list(Recipe.objects.exclude(
+                **{f'{relation}__user': user}
+            ).values_list('id', flat=True)[:BULK_SIZE])
+            removed = list(model.objects.filter(
+                user=user
+            ).values_list('recipe_id', flat=True)[:BULK_SIZE])
+            for method, recipe_ids in (('post', added), ('delete', removed)):
+                if recipe_ids:
+                    cases.append((
+                        f'{name}-bulk:{method}',
+                        method,
+                        reverse(f'api:{url_name}'),
+                        {'recipes': recipe_ids},
+                        True
+                    ))
+        return cases
+
+    @staticmethod
+    def request(client, method, url, data):
+        if data is None:
+            response = getattr(client, method)(url)
+        else:
+            response = getattr(client, method)(
+                url,
+                data=json.dumps(data),
+                content_type='application/json'
+            )
+        if response.streaming:
+            return response, b''.join(response.streaming_content)
+        return response, response.content
+
+    def measure(self, client, method, url, data, repeat, warmup):
+        latencies = []
+        queries = 0
+        for iteration in range(warmup + repeat):
+            try:
+                with transaction.atomic():
+                    with CaptureQueriesContext(connection) as captured:
+                        started = perf_counter()
+                        response, body = self.request(
+                            client, method, url, data
+                        )
+                        elapsed = perf_counter() - started
+                    if method != 'get':
+                        raise Rollback
+            except Rollback:
+                pass
+            if response.status_code >= 400:
+                raise CommandError(
+                    f'{method.upper()} {url}: {response.status_code} '
+                    f'{body[:200]!r}'
+                )
+            if iteration >= warmup:
+                latencies.append(elapsed)
+                queries = max(queries, len(captured))
+        result = {
+            f'p{rank}_ms': round(percentile(latencies, rank) * 1000, 2)
+            for rank in PERCENTILES
+        }
+        result['queries'] = queries
+        return result
+
+    def compare(self, results, baseline, threshold):
+        failures = []
+        for name, result in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            if result['queries'] > expected['queries']:
+                failures.append(
+                    f'{name}: запросов {result["queries"]}, '
+                    f'бюджет {expected["queries"]}'
+                )
+            limit = expected['p95_ms'] * (1 + threshold)
+            if result['p95_ms'] > limit:
+                failures.append(
+                    f'{name}: p95 {result["p95_ms"]} мс, '
+                    f'порог {limit:.2f} мс'
+                )
+        return failures
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(
+            username__startswith=options['prefix'],
+            recipes_count__gt=0
+        ).order_by('id').first()
+        if user is None:
+            raise CommandError(
+                'Нет данных для замера: сначала выполните generate_data.'
+            )
+        token, _ = Token.objects.get_or_create(user=user)
+        host = settings.ALLOWED_HOSTS[0].lstrip('.*') or 'localhost'
+        clients = {
+            True: Client(
+                HTTP_HOST=host,
+                HTTP_AUTHORIZATION=f'Token {token.key}'
+            ),
+            False: Client(HTTP_HOST=host),
+        }
+        results = {}
+        for name, method, url, data, authorized in self.get_cases(user):
+            results[name] = self.measure(
+                clients[authorized], method, url, data,
+                options['repeat'], options['warmup']
+            )
+            result = results[name]
+            self.stdout.write(
+                f'{name:<28} p50 {result["p50_ms"]:>8} мс  '
+                f'p95 {result["p95_ms"]:>8} мс  '
+                f'p99 {result["p99_ms"]:>8} мс  '
+                f'запросов {result["queries"]:>3}'
+            )
+        path = options['baseline']
+        if options['save_baseline']:
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'Эталон записан в {path}.'))
+            return
+        try:
+            with open(path, encoding='utf-8') as file:
+                baseline = json.load(file)
+        except FileNotFoundError:
+            self.stdout.write(f'Эталон {path} не найден, сравнение пропущено.')
+            return
+        failures = self.compare(
+            results, baseline, options['latency_threshold']
+        )
+        for failure in failures:
+            self.stderr.write(failure)
+        if failures:
+            raise CommandError(f'Превышений эталона: {len(failures)}.')
+        self.stdout.write(self.style.SUCCESS('Эталон не превышен.'))
@@ -0,0 +1,155 @@
+from random import Random
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from api.models import Favorite, Purchase, Subscriber
+from recipes.catalog import FEED_VERSION_KEY, bump_version
+from recipes.images import EXTENSIONS, resize_image
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import User
+
+BATCH_SIZE = 1000
+PASSWORD = 'benchmark'
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Генерация воспроизводимого набора данных для нагрузочных замеров.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites', type=int, default=20)
+        parser.add_argument('--carts', type=int, default=5)
+        parser.add_argument('--subscriptions', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='bench')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def bulk_create(self, model, objects):
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.stdout.write(f'{model.__name__}: {len(objects)}')
+
+    def create_users(self, prefix, count):
+        password = make_password(PASSWORD)
+        self.bulk_create(User, [
+            User(
+                username=f'{prefix}{index}',
+                email=f'{prefix}{index}@example.com',
+                first_name=f'Имя{index}',
+                last_name=f'Фамилия{index}',
+                password=password
+            ) for index in range(count)
+        ])
+        return list(User.objects.filter(
+            username__startswith=prefix,
+            email__endswith='@example.com'
+        ).order_by('id').values_list('id', flat=True))
+
+    def create_recipes(self, rng, user_ids, count, tag_ids, image):
+        self.bulk_create(Recipe, [
+            Recipe(
+                author_id=rng.choice(user_ids),
+                name=f'Рецепт {index}',
+                text=f'Описание рецепта {index}.',
+                cooking_time=rng.randint(1, 180),
+                image=image
+            ) for index in range(count)
+        ])
+        recipe_ids = list(Recipe.objects.filter(
+            author_id__in=user_ids
+        ).order_by('id').values_list('id', flat=True))
+        self.bulk_create(Recipe.tags.through, [
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in rng.sample(tag_ids, rng.randint(1, len(tag_ids)))
+        ])
+        return recipe_ids
+
+    def create_links(self, rng, model, field, user_ids, target_ids, count):
+        objects = []
+        for user_id in user_ids:
+            for target_id in rng.sample(
+                target_ids, min(count, len(target_ids))
+            ):
+                if target_id != user_id or field != 'author_id':
+                    objects.append(
+                        model(user_id=user_id, **{field: target_id})
+                    )
+        self.bulk_create(model, objects)
+
+    def handle(self, *args, **options):
+        rng = Random(options['seed'])
+        prefix = options['prefix']
+        self.batch_size = options['batch_size']
+        ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+        if not ingredient_ids:
+            raise CommandError(
+                'Нет ингредиентов: сначала выполните load_ingredients.'
+            )
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f'Пользователи с префиксом "{prefix}" уже существуют.'
+            )
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create([
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in TAGS
+            ])
+        tag_ids = list(Tag.objects.order_by('id').values_list('id', flat=True))
+        image = Recipe.image.field.storage.save(
+            f'recipes/benchmark.{EXTENSIONS[settings.IMAGE_FORMAT]}',
+            ContentFile(resize_image(
+                Image.new('RGB', (480, 320), '#E26C2D'),
+                settings.IMAGE_MAX_SIDE,
+                settings.IMAGE_FORMAT
+            ))
+        )
+        with transaction.atomic():
+            user_ids = self.create_users(prefix, options['users'])
+            recipe_ids = self.create_recipes(
+                rng, user_ids, options['recipes'], tag_ids, image
+            )
+            per_recipe = min(
+                options['ingredients_per_recipe'], len(ingredient_ids)
+            )
+            self.bulk_create(IngredientRecipe, [
+                IngredientRecipe(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=rng.randint(1, 500)
+                )
+                for recipe_id in recipe_ids
+                for ingredient_id in rng.sample(ingredient_ids, per_recipe)
+            ])
+            self.create_links(
+                rng, Favorite, 'recipe_id',
+                user_ids, recipe_ids, options['favorites']
+            )
+            self.create_links(
+                rng, Purchase, 'recipe_id',
+                user_ids, recipe_ids, options['carts']
+            )
+            self.create_links(
+                rng, Subscriber, 'author_id',
+                user_ids, user_ids, options['subscriptions']
+            )
+        call_command('recount_counters', stdout=self.stdout)
+        call_command('rebuild_shopping_lists', stdout=self.stdout)
+        bump_version(FEED_VERSION_KEY)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово. Пароль пользователей {prefix}*: {PASSWORD}'
+        ))
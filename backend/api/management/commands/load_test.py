@@ -0,0 +1,108 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from time import perf_counter
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from api.management.commands.benchmark_api import PERCENTILES, percentile
+
+DEFAULT_PATHS = ('/api/recipes/', '/api/tags/', '/api/ingredients/?name=с')
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный прогон запущенного сервера: пропускная способность '
+        'и задержки при параллельных запросах. Для сравнения пула '
+        'соединений запустите сервер с DB_POOL_MAX_SIZE=0 и с пулом.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument(
+            '--path',
+            action='append',
+            dest='paths',
+            help='Путь для запросов, можно указать несколько раз.'
+        )
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--token', help='Токен пользователя.')
+        parser.add_argument('--metrics-token', default='')
+
+    @staticmethod
+    def run(urls, total, concurrency, headers):
+        numbers = count()
+        local = threading.local()
+        results = []
+        results_lock = threading.Lock()
+
+        def worker():
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+                local.session.headers.update(headers)
+            latencies, errors = [], 0
+            for number in numbers:
+                if number >= total:
+                    break
+                started = perf_counter()
+                try:
+                    response = local.session.get(
+                        urls[number % len(urls)], timeout=30
+                    )
+                    failed = response.status_code >= 400
+                except requests.RequestException:
+                    failed = True
+                latencies.append(perf_counter() - started)
+                errors += failed
+            with results_lock:
+                results.append((latencies, errors))
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            for _ in range(concurrency):
+                executor.submit(worker)
+        latencies = [value for chunk, _ in results for value in chunk]
+        return latencies, sum(errors for _, errors in results)
+
+    def handle(self, *args, **options):
+        base_url = options['url'].rstrip('/')
+        urls = [
+            base_url + path for path in options['paths'] or DEFAULT_PATHS
+        ]
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        started = perf_counter()
+        latencies, errors = self.run(
+            urls, options['requests'], options['concurrency'], headers
+        )
+        elapsed = perf_counter() - started
+        if not latencies:
+            raise CommandError('Не выполнено ни одного запроса.')
+        summary = ', '.join(
+            f'p{rank} {percentile(latencies, rank) * 1000:.1f} мс'
+            for rank in PERCENTILES
+        )
+        self.stdout.write(
+            f'{len(latencies)} запросов за {elapsed:.2f} с, '
+            f'{len(latencies) / elapsed:.1f} запросов/с, '
+            f'ошибок: {errors}; {summary}'
+        )
+        self.write_pool_stats(base_url, options['metrics_token'])
+        if errors:
+            raise CommandError(f'Ошибочных ответов: {errors}.')
+
+    def write_pool_stats(self, base_url, token):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        try:
+            response = requests.get(
+                f'{base_url}/api/_metrics', headers=headers, timeout=10
+            )
+        except requests.RequestException:
+            return
+        if response.status_code != 200:
+            return
+        for line in response.text.splitlines():
+            if line.startswith('foodgram_db_pool_'):
+                self.stdout.write(line)
@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from api.models import ShoppingListItem
+from recipes.models import IngredientRecipe
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересборка или проверка списков покупок '
+        'по актуальному содержимому корзин.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сравнить таблицу с агрегацией, ничего не меняя.'
+        )
+
+    @staticmethod
+    def live_totals():
+        return IngredientRecipe.objects.filter(
+            recipe__purchase__isnull=False
+        ).values(
+            'recipe__purchase__user_id',
+            'ingredient_id'
+        ).annotate(
+            total=Sum('amount')
+        ).order_by().values_list(
+            'recipe__purchase__user_id',
+            'ingredient_id',
+            'total'
+        )
+
+    def verify(self):
+        expected = {
+            (user_id, ingredient_id): total
+            for user_id, ingredient_id, total in self.live_totals().iterator()
+        }
+        stored = {
+            (user_id, ingredient_id): total
+            for user_id, ingredient_id, total in (
+                ShoppingListItem.objects.order_by().values_list(
+                    'user_id', 'ingredient_id', 'total_amount'
+                ).iterator()
+            )
+        }
+        drift = [
+            key for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        ]
+        for user_id, ingredient_id in drift[:20]:
+            self.stdout.write(
+                f'user={user_id} ingredient={ingredient_id}: '
+                f'ожидается {expected.get((user_id, ingredient_id))}, '
+                f'в таблице {stored.get((user_id, ingredient_id))}'
+            )
+        if drift:
+            raise CommandError(f'Расхождений: {len(drift)}.')
+        self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+
+    @transaction.atomic
+    def rebuild(self):
+        ShoppingListItem.objects.all().delete()
+        batch = []
+        created = 0
+        for user_id, ingredient_id, total in self.live_totals().iterator():
+            batch.append(ShoppingListItem(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                total_amount=total
+            ))
+            if len(batch) == BATCH_SIZE:
+                ShoppingListItem.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        ShoppingListItem.objects.bulk_create(batch)
+        created += len(batch)
+        self.stdout.write(
+            self.style.SUCCESS(f'Записано позиций: {created}.')
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            self.verify()
+        else:
+            self.rebuild()
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from api.models import Favorite, Purchase, Subscriber
+from recipes.models import Recipe
+from users.models import User
+
+
+def count_of(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                total=Count('pk')
+            ).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'in_carts_count', Purchase, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscriber, 'author'),
+)
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт денормализованных счётчиков рецептов и пользователей.'
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        for model, field, source, source_field in COUNTERS:
+            drift = model.objects.annotate(
+                actual=count_of(source, source_field)
+            ).exclude(**{field: F('actual')}).count()
+            if drift:
+                model.objects.update(**{field: count_of(source, source_field)})
+            self.stdout.write(
+                f'{model.__name__}.{field}: исправлено записей {drift}'
+            )
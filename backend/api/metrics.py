@@ -0,0 +1,231 @@
+import json
+import os
+import re
+import tempfile
+from bisect import bisect_left
+from collections import Counter
+from threading import Lock, Timer
+from time import perf_counter
+
+from django.conf import settings
+
+from backend.db.pool import pools
+from recipes.images import image_pool
+from recipes.page_cache import page_cache
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+DUMP_INTERVAL = 1.0
+IN_LIST = re.compile(r'\((?:%s, )+%s\)')
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def fingerprint(sql):
+    return IN_LIST.sub('(...)', LITERAL.sub('?', sql))
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        shapes = Counter()
+        for sql, count in self.statements.items():
+            shapes[fingerprint(sql)] += count
+        return sum(count - 1 for count in shapes.values())
+
+
+class Histogram:
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, route, value):
+        series = self.series.get(route)
+        if series is None:
+            series = self.series[route] = [0] * (len(self.buckets) + 1)
+            series.append(0.0)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, series):
+        yield f'# HELP {self.name} {self.description}'
+        yield f'# TYPE {self.name} histogram'
+        for route, values in sorted(series.items()):
+            total = 0
+            for bound, count in zip(self.buckets, values):
+                total += count
+                yield (
+                    f'{self.name}_bucket{{route="{route}",le="{bound}"}} '
+                    f'{total}'
+                )
+            total += values[-2]
+            yield f'{self.name}_bucket{{route="{route}",le="+Inf"}} {total}'
+            yield f'{self.name}_sum{{route="{route}"}} {values[-1]}'
+            yield f'{self.name}_count{{route="{route}"}} {total}'
+
+
+def merge_series(merged, series):
+    for route, values in series.items():
+        current = merged.get(route)
+        if current is None:
+            merged[route] = list(values)
+        else:
+            for index, value in enumerate(values):
+                current[index] += value
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def process_stats():
+    stats = []
+    for name, values in (
+        ('foodgram_feed_cache', page_cache.stats),
+        ('foodgram_image_pool', image_pool.stats),
+    ):
+        stats.extend(
+            (f'{name}_{key}', '', value) for key, value in values.items()
+        )
+    for alias, pool in sorted(pools.items()):
+        stats.extend(
+            (f'foodgram_db_pool_{key}', f'alias="{alias}",', value)
+            for key, value in pool.stats.items()
+        )
+    return stats
+
+
+class Registry:
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = Lock()
+        self._timer = None
+        self._timer_pid = None
+        self.duration = Histogram(
+            'foodgram_request_duration_seconds',
+            'Время обработки запроса.',
+            DURATION_BUCKETS
+        )
+        self.sampled = {
+            'queries': Histogram(
+                'foodgram_request_queries',
+                'Количество SQL-запросов (выборочно).',
+                QUERY_BUCKETS
+            ),
+            'duplicates': Histogram(
+                'foodgram_request_duplicate_queries',
+                'Повторы SQL-запросов одной формы (выборочно).',
+                QUERY_BUCKETS
+            ),
+            'db': Histogram(
+                'foodgram_request_db_seconds',
+                'Время выполнения SQL (выборочно).',
+                DURATION_BUCKETS
+            ),
+            'app': Histogram(
+                'foodgram_request_app_seconds',
+                'Время представления без SQL (выборочно).',
+                DURATION_BUCKETS
+            ),
+            'render': Histogram(
+                'foodgram_request_render_seconds',
+                'Время рендеринга ответа (выборочно).',
+                DURATION_BUCKETS
+            ),
+        }
+
+    @property
+    def histograms(self):
+        return {'duration': self.duration, **self.sampled}
+
+    def observe(self, route, duration, **sampled):
+        with self._lock:
+            self.duration.observe(route, duration)
+            for key, value in sampled.items():
+                self.sampled[key].observe(route, value)
+            timer = None
+            if self._timer is None or self._timer_pid != os.getpid():
+                timer = self._timer = Timer(DUMP_INTERVAL, self.dump)
+                timer.daemon = True
+                self._timer_pid = os.getpid()
+        if timer is not None:
+            timer.start()
+
+    def dump(self):
+        with self._lock:
+            self._timer = None
+            data = json.dumps({
+                'histograms': {
+                    name: histogram.series
+                    for name, histogram in self.histograms.items()
+                },
+                'stats': process_stats(),
+            })
+        os.makedirs(self.directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(
+            dir=self.directory, suffix='.tmp'
+        )
+        with os.fdopen(descriptor, 'w') as output:
+            output.write(data)
+        os.replace(
+            temporary, os.path.join(self.directory, f'{os.getpid()}.json')
+        )
+
+    def load(self):
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                pid, extension = os.path.splitext(entry.name)
+                if extension != '.json' or not pid.isdigit():
+                    continue
+                try:
+                    with open(entry.path) as source:
+                        yield int(pid), json.load(source)
+                except (OSError, ValueError):
+                    continue
+
+    def render(self):
+        self.dump()
+        merged = {name: {} for name in self.histograms}
+        gauges = {}
+        for pid, data in sorted(self.load()):
+            for name, series in data['histograms'].items():
+                if name in merged:
+                    merge_series(merged[name], series)
+            if is_alive(pid):
+                for name, labels, value in data['stats']:
+                    gauges.setdefault(name, []).append(
+                        f'{name}{{{labels}pid="{pid}"}} {value}'
+                    )
+        lines = []
+        for name, histogram in self.histograms.items():
+            lines.extend(histogram.render(merged[name]))
+        for name, samples in gauges.items():
+            lines.append(f'# TYPE {name} gauge')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry(settings.METRICS_DIR)
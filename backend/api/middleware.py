@@ -0,0 +1,113 @@
+import asyncio
+from contextlib import ExitStack, contextmanager
+from random import random
+from time import perf_counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from api.metrics import QueryRecorder, registry
+
+
+@contextmanager
+def record_queries(recorder):
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        yield
+
+
+def get_route(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None or match.url_name is None:
+        return 'unmatched'
+    return match.url_name
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = perf_counter()
+        if random() >= settings.METRICS_SAMPLE_RATE:
+            response = self.get_response(request)
+            registry.observe(get_route(request), perf_counter() - started)
+            return response
+        recorder = request._query_recorder = QueryRecorder()
+        with record_queries(recorder):
+            response = self.get_response(request)
+        return self.finish(request, response, started, recorder)
+
+    async def __acall__(self, request):
+        started = perf_counter()
+        if random() >= settings.METRICS_SAMPLE_RATE:
+            response = await self.get_response(request)
+            registry.observe(get_route(request), perf_counter() - started)
+            return response
+        recorder = request._query_recorder = QueryRecorder()
+        queries = record_queries(recorder)
+        await sync_to_async(queries.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(queries.__exit__)(None, None, None)
+        return self.finish(request, response, started, recorder)
+
+    def finish(self, request, response, started, recorder):
+        duration = perf_counter() - started
+        timings = getattr(request, '_view_timings', {})
+        view_finished = timings.get('view_finished', started + duration)
+        view_db = (
+            timings.get('view_db', recorder.seconds)
+            - timings.get('db_started', 0.0)
+        )
+        app = max(
+            view_finished - timings.get('view_started', started) - view_db,
+            0.0
+        )
+        render = timings.get('render_finished', view_finished) - view_finished
+        duplicates = recorder.duplicates
+        registry.observe(
+            get_route(request),
+            duration,
+            queries=recorder.count,
+            duplicates=duplicates,
+            db=recorder.seconds,
+            app=app,
+            render=render
+        )
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={recorder.seconds * 1000:.1f};'
+            f'desc="{recorder.count} queries, {duplicates} duplicated"',
+            f'app;dur={app * 1000:.1f}',
+            f'render;dur={render * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, '_query_recorder'):
+            request._view_timings = {
+                'view_started': perf_counter(),
+                'db_started': request._query_recorder.seconds,
+            }
+
+    def process_template_response(self, request, response):
+        timings = getattr(request, '_view_timings', None)
+        if timings is not None:
+            timings['view_finished'] = perf_counter()
+            timings['view_db'] = request._query_recorder.seconds
+
+            def render_finished(response):
+                timings['render_finished'] = perf_counter()
+            response.add_post_render_callback(render_finished)
+        return response
@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
 
-from recipes.models import Recipe
+from recipes.models import Ingredient, IngredientRecipe, Recipe
 from users.models import User
 
 
@@ -9,13 +10,15 @@ class Subscriber(models.Model):
         User,
         verbose_name='Подписчик',
         related_name='follower',
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
     author = models.ForeignKey(
         User,
         verbose_name='Автор',
         related_name='author',
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
 
     class Meta:
@@ -26,13 +29,20 @@ class Subscriber(models.Model):
                 fields=('user', 'author', ),
                 name='unique_author'),
         )
+        indexes = (
+            models.Index(
+                fields=('author', 'user'),
+                name='subscriber_author_user_idx'
+            ),
+        )
 
 
 class Favorite(models.Model):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
-        related_name='favorite_recipe')
+        related_name='favorite_recipe',
+        db_index=False)
     recipe = models.ForeignKey(
         Recipe,
         on_delete=models.CASCADE,)
@@ -46,17 +56,25 @@ class Favorite(models.Model):
                 name='unique_favorite',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='favorite_user_id_idx'
+            )
+        ]
 
 
 class Purchase(models.Model):
     user = models.ForeignKey(
         User,
         related_name='purchase',
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
     recipe = models.ForeignKey(
         Recipe,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        db_index=False
     )
     pub_date = models.DateTimeField(
         auto_now_add=True,
@@ -75,6 +93,120 @@ class Purchase(models.Model):
                 name='unique_purchase'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'],
+                name='purchase_user_date_idx'
+            ),
+            models.Index(
+                fields=['recipe', 'user'],
+                name='purchase_recipe_user_idx'
+            )
+        ]
 
     def __str__(self):
         return f'{self.recipe}: {self.user}'
+
+
+class ShoppingListQuerySet(models.QuerySet):
+    def apply_delta(self, user_ids, amounts):
+        amounts = {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items() if amount
+        }
+        if not amounts:
+            return
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        with transaction.atomic():
+            self.bulk_create(
+                [
+                    self.model(user_id=user_id, ingredient_id=ingredient_id)
+                    for user_id in user_ids
+                    for ingredient_id, amount in amounts.items()
+                    if amount > 0
+                ],
+                ignore_conflicts=True
+            )
+            items = self.filter(
+                user_id__in=user_ids,
+                ingredient_id__in=amounts
+            )
+            items.update(total_amount=F('total_amount') + Case(
+                *[
+                    When(ingredient_id=ingredient_id, then=Value(amount))
+                    for ingredient_id, amount in amounts.items()
+                ],
+                default=Value(0)
+            ))
+            items.filter(total_amount__lte=0).delete()
+
+    def add_recipes(self, user_ids, recipe_ids, sign=1):
+        amounts = IngredientRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values('ingredient_id').annotate(
+            total=models.Sum('amount')
+        ).order_by().values_list('ingredient_id', 'total')
+        self.apply_delta(
+            user_ids,
+            {ingredient_id: sign * total for ingredient_id, total in amounts}
+        )
+
+    def remove_recipes(self, user_ids, recipe_ids):
+        self.add_recipes(user_ids, recipe_ids, sign=-1)
+
+    def delete_recipe(self, recipe_id):
+        self.remove_recipes(
+            Purchase.objects.filter(
+                recipe_id=recipe_id
+            ).order_by().values_list('user_id', flat=True),
+            [recipe_id]
+        )
+
+    def change_recipe(self, recipe_id, old_amounts, new_amounts):
+        self.apply_delta(
+            Purchase.objects.filter(
+                recipe_id=recipe_id
+            ).order_by().values_list('user_id', flat=True),
+            {
+                ingredient_id: (
+                    new_amounts.get(ingredient_id, 0)
+                    - old_amounts.get(ingredient_id, 0)
+                )
+                for ingredient_id in {*old_amounts, *new_amounts}
+            }
+        )
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='shopping_list',
+        on_delete=models.CASCADE,
+        db_index=False
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE
+    )
+    total_amount = models.IntegerField(
+        default=0,
+        verbose_name='Общее количество'
+    )
+
+    objects = ShoppingListQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Списки покупок'
+        ordering = ['ingredient__name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} {self.total_amount}'
@@ -0,0 +1,95 @@
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from api.models import Favorite, Purchase, Subscriber
+from recipes.catalog import bump_version, get_version
+
+FAVORITES = 'favorites'
+CART = 'cart'
+FOLLOWING = 'following'
+SOURCES = {
+    FAVORITES: (Favorite, 'recipe_id'),
+    CART: (Purchase, 'recipe_id'),
+    FOLLOWING: (Subscriber, 'author_id'),
+}
+KINDS = {model: kind for kind, (model, _) in SOURCES.items()}
+TYPECODE = 'q'
+
+
+class IdSet:
+    def __init__(self, ids=None):
+        self.ids = array(TYPECODE) if ids is None else ids
+
+    def __contains__(self, pk):
+        index = bisect_left(self.ids, pk)
+        return index < len(self.ids) and self.ids[index] == pk
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def generation_key(kind, user_id):
+    return f'relations:{kind}:{user_id}:generation'
+
+
+def cache_key(kind, user_id):
+    generation = get_version(generation_key(kind, user_id))
+    return f'relations:{kind}:{user_id}:{generation}'
+
+
+def load_ids(kind, user_id):
+    key = cache_key(kind, user_id)
+    ids = array(TYPECODE)
+    data = cache.get(key)
+    if data is not None:
+        ids.frombytes(data)
+        return ids
+    model, field = SOURCES[kind]
+    ids.extend(sorted(
+        model.objects.filter(user_id=user_id).values_list(field, flat=True)
+    ))
+    cache.set(key, ids.tobytes(), settings.RELATIONS_CACHE_TIMEOUT)
+    return ids
+
+
+class UserRelations:
+    def __init__(self, user):
+        self.user_id = None if user.is_anonymous else user.id
+        self.sets = {}
+
+    def get(self, kind):
+        if kind not in self.sets:
+            self.sets[kind] = IdSet(
+                None if self.user_id is None
+                else load_ids(kind, self.user_id)
+            )
+        return self.sets[kind]
+
+    @property
+    def favorites(self):
+        return self.get(FAVORITES)
+
+    @property
+    def cart(self):
+        return self.get(CART)
+
+    @property
+    def following(self):
+        return self.get(FOLLOWING)
+
+
+def user_relations(request):
+    relations = getattr(request, '_user_relations', None)
+    if relations is None:
+        relations = UserRelations(request.user)
+        request._user_relations = relations
+    return relations
+
+
+def invalidate_relations(kind, user_id):
+    key = generation_key(kind, user_id)
+    transaction.on_commit(lambda: bump_version(key))
@@ -3,13 +3,17 @@ from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
 from api.models import Purchase, Subscriber
+from api.relations import user_relations
+from recipes.fields import ImageVariantsField
 from recipes.models import Recipe
-from recipes.serializers import RecipeReadSerializer
 from users.models import User
 
+BULK_MAX_RECIPES = 100
+
 
 class RecipeSubscriptionSerializer(serializers.ModelSerializer):
     image = Base64ImageField()
+    images = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -17,6 +21,7 @@ class RecipeSubscriptionSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'images',
             'cooking_time'
         )
 
@@ -66,9 +71,15 @@ class UserSubscribeSerializer(serializers.ModelSerializer):
             ).data
 
 
+def get_recipes_limit(request):
+    try:
+        return int(request.GET['recipes_limit'])
+    except (KeyError, ValueError):
+        return None
+
+
 class SubscribeListSerializer(serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -84,45 +95,32 @@ class SubscribeListSerializer(serializers.ModelSerializer):
             'recipes_count'
         )
 
-    def get_is_subscribed(self, user):
-        current_user = self.context.get('current_user')
-        other_user = user.author.all()
-        if user.is_anonymous:
-            return False
-        if other_user.count() == 0:
-            return False
-        return Subscriber.objects.filter(
-            user=user,
-            author=current_user
-        ).exists()
+    def get_is_subscribed(self, obj):
+        return obj.id in user_relations(self.context['request']).following
 
     def get_recipes(self, obj):
-        recipes_limit = self.context.get('request').GET.get(
-            'recipes_limit',
-            None
-        )
-        if recipes_limit is not None:
-            recipes = obj.recipes.all()[:int(recipes_limit)]
-        else:
-            recipes = obj.recipes.all()
         request = self.context.get('request')
-        return RecipeReadSerializer(
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            recipes = obj.recipes.all()[:get_recipes_limit(request)]
+        return RecipeSubscriptionSerializer(
             recipes,
             many=True,
             context={'request': request}
         ).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class FavoriteSerializer(serializers.ModelSerializer):
+    images = ImageVariantsField()
+
     class Meta:
         model = Recipe
         fields = (
             'id',
             'name',
             'image',
+            'images',
             'cooking_time'
         )
 
@@ -134,3 +132,14 @@ class PurchaseSerializer(serializers.ModelSerializer):
             'user',
             'recipe'
         )
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=BULK_MAX_RECIPES,
+        error_messages={
+            'max_length': 'Не больше {max_length} рецептов за запрос.'
+        }
+    )
@@ -0,0 +1,47 @@
+import csv
+import json
+
+NAME = 'ingredient__name'
+UNIT = 'ingredient__measurement_unit'
+TOTAL = 'total'
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def render_txt(items):
+    for item in items:
+        yield f'{item[NAME]}: {item[TOTAL]} {item[UNIT]}\n'
+
+
+def render_csv(items):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Количество', 'Единица измерения'))
+    for item in items:
+        yield writer.writerow((item[NAME], item[TOTAL], item[UNIT]))
+
+
+def render_json(items):
+    separator = ''
+    yield '['
+    for item in items:
+        yield separator + json.dumps(
+            {
+                'name': item[NAME],
+                'amount': item[TOTAL],
+                'measurement_unit': item[UNIT]
+            },
+            ensure_ascii=False
+        )
+        separator = ','
+    yield ']'
+
+
+FORMATS = {
+    'txt': ('text/plain; charset=utf-8', render_txt),
+    'csv': ('text/csv; charset=utf-8', render_csv),
+    'json': ('application/json; charset=utf-8', render_json),
+}
+DEFAULT_FORMAT = 'txt'
@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.models import Favorite, Purchase, Subscriber
+from api.relations import KINDS, invalidate_relations
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=Purchase)
+@receiver(post_delete, sender=Purchase)
+@receiver(post_save, sender=Subscriber)
+@receiver(post_delete, sender=Subscriber)
+def relations_changed(sender, instance, **kwargs):
+    invalidate_relations(KINDS[sender], instance.user_id)
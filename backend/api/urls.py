@@ -1,17 +1,45 @@
+from django.conf import settings
 from django.urls import include, path
 
+from api import async_views
 from api.views import (
+    DownloadCartApiView,
     FavoriteViewSet,
     FollowApiView,
     FollowListApiView,
     PurchaseViewSet,
-    download_cart
+    metrics
 )
 
 app_name = 'api'
 
 
+if settings.ASYNC_VIEWS:
+    download_view = async_views.download_cart
+    subscribe_view = async_views.subscribe
+    favorite_view = async_views.favorite
+    cart_view = async_views.shopping_cart
+    favorite_bulk_view = async_views.favorite_bulk
+    cart_bulk_view = async_views.shopping_cart_bulk
+else:
+    download_view = DownloadCartApiView.as_view()
+    subscribe_view = FollowApiView.as_view()
+    favorite_view = FavoriteViewSet.as_view(
+        {'post': 'create', 'delete': 'delete'}
+    )
+    cart_view = PurchaseViewSet.as_view(
+        {'post': 'create', 'delete': 'delete'}
+    )
+    favorite_bulk_view = FavoriteViewSet.as_view(
+        {'post': 'create_many', 'delete': 'delete_many'}
+    )
+    cart_bulk_view = PurchaseViewSet.as_view(
+        {'post': 'create_many', 'delete': 'delete_many'}
+    )
+
+
 urlpatterns = [
+    path('_metrics', metrics, name='metrics'),
     path(
         'users/subscriptions/',
         FollowListApiView.as_view(),
@@ -19,25 +47,32 @@ urlpatterns = [
     ),
     path(
         'recipes/download_shopping_cart/',
-        download_cart, name='download'
+        download_view,
+        name='download'
     ),
     path(
         'users/<int:users_id>/subscribe/',
-        FollowApiView.as_view(),
+        subscribe_view,
         name='subscribe',
     ),
     path(
-        'recipes/<recipes_id>/favorite/',
-        FavoriteViewSet.as_view(
-            {'post': 'create', 'delete': 'delete'}
-        ),
+        'recipes/favorite/bulk/',
+        favorite_bulk_view,
+        name='favorite-bulk'
+    ),
+    path(
+        'recipes/shopping_cart/bulk/',
+        cart_bulk_view,
+        name='cart-bulk'
+    ),
+    path(
+        'recipes/<int:recipes_id>/favorite/',
+        favorite_view,
         name='favorite'
     ),
     path(
-        'recipes/<recipes_id>/shopping_cart/',
-        PurchaseViewSet.as_view(
-            {'post': 'create', 'delete': 'delete'}
-        ),
+        'recipes/<int:recipes_id>/shopping_cart/',
+        cart_view,
         name='cart'
     ),
     path(
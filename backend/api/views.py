@@ -1,66 +1,115 @@
-from django.db import IntegrityError
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch
+from django.conf import settings
+from django.http import (
+    HttpResponse,
+    HttpResponseForbidden,
+    StreamingHttpResponse
+)
 from django.shortcuts import get_object_or_404
+from django.utils.crypto import constant_time_compare
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
-from api.models import Favorite, Purchase, Subscriber
+from api import shopping_list
+from api.counters import change_counter
+from api.metrics import registry
+from api.models import Favorite, Purchase, ShoppingListItem, Subscriber
+from api.negotiation import IgnoreFormatContentNegotiation
+from api.relations import CART, FAVORITES, invalidate_relations
 from api.serializers import (
     FavoriteSerializer,
     PurchaseSerializer,
-    UserSubscribeSerializer
+    RecipeIdsSerializer,
+    SubscribeListSerializer,
+    UserSubscribeSerializer,
+    get_recipes_limit
 )
-from recipes.models import IngredientRecipe, Recipe
+from recipes.models import Recipe
 from users.models import User
 
 
-@api_view(['GET', ])
-@permission_classes([IsAuthenticated])
-def download_cart(request):
-    purchase_list = IngredientRecipe.objects.filter(
-        recipe__purchase__user=request.user
+def metrics(request):
+    token = settings.METRICS_TOKEN
+    if not request.user.is_staff and not (token and constant_time_compare(
+            request.headers.get('Authorization', ''), f'Bearer {token}')):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+def get_purchase_list(user):
+    return ShoppingListItem.objects.filter(
+        user=user
     ).values(
-        'ingredient__name',
-        'ingredient__measurement_unit'
-    ).annotate(total=Sum('amount'))
-    shopping_list = []
-    for item in purchase_list:
-        shopping_list.append(
-            f'{item["ingredient__name"]}: {item["total"]} '
-            f'{item["ingredient__measurement_unit"]}\n'
-        )
-    response = HttpResponse(shopping_list, 'Content-Type: text/plain')
+        shopping_list.NAME,
+        shopping_list.UNIT,
+        total=F('total_amount')
+    ).order_by(shopping_list.NAME)
+
+
+def unsupported_format(export_format):
+    return {'errors': f'Неподдерживаемый формат: {export_format}.'}
+
+
+def shopping_list_response(export_format, items):
+    content_type, render = shopping_list.FORMATS[export_format]
+    response = StreamingHttpResponse(render(items), content_type=content_type)
     response['Content-Disposition'] = (
         'attachment;'
-        'filename="shopping_list.txt"'
+        f'filename="shopping_list.{export_format}"'
     )
     return response
 
 
-class FollowListApiView(ListAPIView):
+class DownloadCartApiView(APIView):
     permission_classes = [IsAuthenticated, ]
-    serializer_class = UserSubscribeSerializer
+    content_negotiation_class = IgnoreFormatContentNegotiation
+
+    def get(self, request):
+        export_format = request.GET.get(
+            'format',
+            shopping_list.DEFAULT_FORMAT
+        )
+        if export_format not in shopping_list.FORMATS:
+            return Response(
+                data=unsupported_format(export_format),
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return shopping_list_response(
+            export_format,
+            get_purchase_list(request.user).iterator()
+        )
+
 
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context.update({'request': self.request})
-        return context
+class FollowListApiView(ListAPIView):
+    permission_classes = [IsAuthenticated, ]
+    serializer_class = SubscribeListSerializer
 
     def get_queryset(self):
         user = self.request.user
-        return User.objects.filter(author__user=user)
+        recipes = Recipe.objects.filter(
+            author__in=Subscriber.objects.filter(user=user).values('author')
+        )
+        recipes_limit = get_recipes_limit(self.request)
+        if recipes_limit is not None:
+            recipes = recipes.latest_per_author(recipes_limit)
+        return User.objects.filter(author__user=user).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        ).order_by('username')
 
 
 class FollowApiView(APIView):
     permission_classes = [IsAuthenticated, ]
 
-    def post(self, request, users_id):
+    @staticmethod
+    def follow(request, users_id):
         user = request.user
         data = {
             'author': users_id,
@@ -71,84 +120,214 @@ class FollowApiView(APIView):
             context={'request': request}
         )
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(
-            serializer.data,
-            status=status.HTTP_201_CREATED
-        )
+        with transaction.atomic():
+            serializer.save()
+            change_counter(
+                User.objects.filter(id=users_id), 'followers_count', 1
+            )
+        return serializer.data, status.HTTP_201_CREATED
 
-    def delete(self, request, users_id):
+    @staticmethod
+    def unfollow(request, users_id):
         user = request.user
         author = get_object_or_404(
             User,
             id=users_id
         )
-        if author is None:
-            return Response(status=status.HTTP_404_NOT_FOUND)
         deleting_entry = Subscriber.objects.filter(
             user=user,
             author=author
         )
-        if deleting_entry.exists():
-            deleting_entry.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response(status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            deleted, _ = deleting_entry.delete()
+            if deleted:
+                change_counter(
+                    User.objects.filter(id=author.id), 'followers_count', -1
+                )
+                return None, status.HTTP_204_NO_CONTENT
+        return None, status.HTTP_400_BAD_REQUEST
+
+    def post(self, request, users_id):
+        data, status_code = self.follow(request, users_id)
+        return Response(data, status=status_code)
+
+    def delete(self, request, users_id):
+        data, status_code = self.unfollow(request, users_id)
+        return Response(data, status=status_code)
 
 
 class BaseFavoriteCartViewSet(ModelViewSet):
     permission_classes = [IsAuthenticated, ]
+    counter_field = None
+    relation = None
 
-    def create(self, request, *args, **kwargs):
-        recipe = int(self.kwargs['recipes_id'])
+    def change_counter(self, recipe_id, delta):
+        change_counter(
+            Recipe.objects.filter(id=recipe_id), self.counter_field, delta
+        )
+
+    def on_added(self, user, recipe_ids):
+        pass
+
+    def on_removed(self, user, recipe_ids):
+        pass
+
+    @staticmethod
+    def recipe_ids(data):
+        serializer = RecipeIdsSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return list(dict.fromkeys(serializer.validated_data['recipes']))
+
+    def lock_user(self, user):
+        list(User.objects.select_for_update().filter(
+            id=user.id
+        ).values_list('id', flat=True))
+
+    def add(self, user, recipe_id):
         recipe = get_object_or_404(
             Recipe,
-            id=recipe
+            id=int(recipe_id)
         )
         try:
-            self.model.objects.create(
-                user=request.user,
-                recipe=recipe
-            )
+            with transaction.atomic():
+                self.lock_user(user)
+                self.model.objects.create(
+                    user=user,
+                    recipe=recipe
+                )
+                self.change_counter(recipe.id, 1)
+                self.on_added(user, [recipe.id])
         except IntegrityError:
             data = {
                 'errors': 'Ошибка добавления рецепта в список.'
             }
-            return Response(data=data, status=status.HTTP_400_BAD_REQUEST)
+            return data, status.HTTP_400_BAD_REQUEST
         data = {
             'status': 'Рецепт успешно добавлен в список.'
         }
-        return Response(data=data, status=status.HTTP_201_CREATED)
+        return data, status.HTTP_201_CREATED
 
-    def delete(self, request, *args, **kwargs):
-        recipe = self.kwargs['recipes_id']
-        user_id = request.user.id
+    def remove(self, user, recipe_id):
         try:
-            self.model.objects.get(
-                user__id=user_id,
-                recipe__id=recipe
-            ).delete()
+            with transaction.atomic():
+                self.lock_user(user)
+                self.model.objects.get(
+                    user__id=user.id,
+                    recipe__id=recipe_id
+                ).delete()
+                self.change_counter(recipe_id, -1)
+                self.on_removed(user, [recipe_id])
         except self.model.DoesNotExist:
             data = {
                 'errors': 'Ошибка удаления рецепта из списка.'
             }
-            return Response(
-                data=data,
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            return data, status.HTTP_400_BAD_REQUEST
         data = {
             'status': 'Рецепт успешно удален из списка.'
         }
-        return Response(data=data)
+        return data, status.HTTP_200_OK
+
+    def add_many(self, user, recipe_ids):
+        found = set(Recipe.objects.filter(
+            id__in=recipe_ids
+        ).values_list('id', flat=True))
+        with transaction.atomic():
+            self.lock_user(user)
+            existing = set(self.model.objects.filter(
+                user=user,
+                recipe_id__in=found
+            ).values_list('recipe_id', flat=True))
+            added = [
+                pk for pk in recipe_ids if pk in found and pk not in existing
+            ]
+            if added:
+                self.model.objects.bulk_create(
+                    [self.model(user=user, recipe_id=pk) for pk in added],
+                    ignore_conflicts=True
+                )
+                change_counter(
+                    Recipe.objects.filter(id__in=added), self.counter_field, 1
+                )
+                self.on_added(user, added)
+                invalidate_relations(self.relation, user.id)
+        data = {
+            'added': added,
+            'existing': [pk for pk in recipe_ids if pk in existing],
+            'not_found': [pk for pk in recipe_ids if pk not in found],
+        }
+        return data, status.HTTP_200_OK
+
+    def remove_many(self, user, recipe_ids):
+        found = set(Recipe.objects.filter(
+            id__in=recipe_ids
+        ).values_list('id', flat=True))
+        with transaction.atomic():
+            self.lock_user(user)
+            entries = self.model.objects.filter(
+                user=user,
+                recipe_id__in=found
+            )
+            removed_ids = set(entries.values_list('recipe_id', flat=True))
+            removed = [pk for pk in recipe_ids if pk in removed_ids]
+            if removed:
+                entries.delete()
+                change_counter(
+                    Recipe.objects.filter(id__in=removed),
+                    self.counter_field,
+                    -1
+                )
+                self.on_removed(user, removed)
+        data = {
+            'removed': removed,
+            'missing': [
+                pk for pk in recipe_ids
+                if pk in found and pk not in removed_ids
+            ],
+            'not_found': [pk for pk in recipe_ids if pk not in found],
+        }
+        return data, status.HTTP_200_OK
+
+    def create(self, request, *args, **kwargs):
+        data, status_code = self.add(request.user, self.kwargs['recipes_id'])
+        return Response(data=data, status=status_code)
+
+    def delete(self, request, *args, **kwargs):
+        data, status_code = self.remove(
+            request.user, self.kwargs['recipes_id']
+        )
+        return Response(data=data, status=status_code)
+
+    def create_many(self, request, *args, **kwargs):
+        data, status_code = self.add_many(
+            request.user, self.recipe_ids(request.data)
+        )
+        return Response(data=data, status=status_code)
+
+    def delete_many(self, request, *args, **kwargs):
+        data, status_code = self.remove_many(
+            request.user, self.recipe_ids(request.data)
+        )
+        return Response(data=data, status=status_code)
 
 
 class PurchaseViewSet(BaseFavoriteCartViewSet):
     serializer_class = PurchaseSerializer
     queryset = Purchase.objects.all()
     model = Purchase
+    counter_field = 'in_carts_count'
+    relation = CART
     page_size = 999
 
+    def on_added(self, user, recipe_ids):
+        ShoppingListItem.objects.add_recipes([user.id], recipe_ids)
+
+    def on_removed(self, user, recipe_ids):
+        ShoppingListItem.objects.remove_recipes([user.id], recipe_ids)
+
 
 class FavoriteViewSet(BaseFavoriteCartViewSet):
     serializer_class = FavoriteSerializer
     queryset = Favorite.objects.all()
     model = Favorite
+    counter_field = 'favorites_count'
+    relation = FAVORITES
@@ -0,0 +1,18 @@
+import os
+
+from asgiref.sync import ThreadSensitiveContext
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'True')
+# Синхронный код каждого запроса выполняется в отдельном потоке, поэтому
+# постоянные соединения не переживут запрос; переиспользуйте их через пул
+# (DB_POOL_MAX_SIZE).
+os.environ['DB_CONN_MAX_AGE'] = '0'
+
+django_application = get_asgi_application()
+
+
+async def application(scope, receive, send):
+    async with ThreadSensitiveContext():
+        await django_application(scope, receive, send)
@@ -0,0 +1,70 @@
+from functools import partial
+
+from django.db.backends.postgresql import base
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from backend.db.pool import get_pool
+
+Database = base.Database
+
+
+def ping(conn):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+    except Database.Error:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с проверкой постоянных соединений и пулом на процесс."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_needed = False
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        connect = partial(super().get_new_connection, conn_params)
+        while True:
+            conn, reused = pool.acquire(connect, Database.OperationalError)
+            if (not reused
+                    or not self.settings_dict.get('CONN_HEALTH_CHECKS')
+                    or ping(conn)):
+                return conn
+            pool.release(conn, discard=True)
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        conn = self.connection
+        discard = bool(conn.closed)
+        if not discard:
+            try:
+                if conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Database.Error:
+                discard = True
+        pool.release(conn, discard=discard)
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_needed = True
+
+    def ensure_connection(self):
+        if (self.health_check_needed
+                and self.connection is not None
+                and not self.in_atomic_block):
+            self.health_check_needed = False
+            if (self.settings_dict.get('CONN_HEALTH_CHECKS')
+                    and not self.is_usable()):
+                self.close()
+        super().ensure_connection()
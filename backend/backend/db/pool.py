@@ -0,0 +1,83 @@
+from threading import Condition, Lock
+from time import monotonic
+
+_pools_lock = Lock()
+pools = {}
+
+
+class ConnectionPool:
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._condition = Condition()
+        self._idle = []
+        self._size = 0
+        self.stats = {
+            'in_use': 0,
+            'idle': 0,
+            'created': 0,
+            'discarded': 0,
+            'waits': 0,
+            'timeouts': 0,
+        }
+
+    def acquire(self, connect, error_class):
+        deadline = monotonic() + self.timeout
+        with self._condition:
+            if not self._idle and self._size >= self.max_size:
+                self.stats['waits'] += 1
+            while not self._idle and self._size >= self.max_size:
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    self.stats['timeouts'] += 1
+                    raise error_class(
+                        'Нет свободных соединений в пуле '
+                        f'(размер {self.max_size}, '
+                        f'ожидание {self.timeout} с).'
+                    )
+                self._condition.wait(remaining)
+            self.stats['in_use'] += 1
+            if self._idle:
+                self.stats['idle'] -= 1
+                return self._idle.pop(), True
+            self._size += 1
+        try:
+            conn = connect()
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self.stats['in_use'] -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self.stats['created'] += 1
+        return conn, False
+
+    def release(self, conn, discard=False):
+        with self._condition:
+            self.stats['in_use'] -= 1
+            if discard:
+                self._size -= 1
+                self.stats['discarded'] += 1
+            else:
+                self._idle.append(conn)
+                self.stats['idle'] += 1
+            self._condition.notify()
+        if discard:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+def get_pool(alias, settings_dict):
+    options = settings_dict.get('POOL') or {}
+    max_size = options.get('MAX_SIZE', 0)
+    if max_size <= 0:
+        return None
+    with _pools_lock:
+        if alias not in pools:
+            pools[alias] = ConnectionPool(
+                max_size, options.get('TIMEOUT', 10)
+            )
+        return pools[alias]
@@ -33,6 +33,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -63,21 +64,55 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
+ASGI_APPLICATION = 'backend.asgi.application'
+
+ASYNC_VIEWS = (os.getenv('ASYNC_VIEWS', default=False) == 'True')
+
 
 AUTH_USER_MODEL = 'users.User'
 
 
 DATABASES = {
     'default': {
-        'ENGINE': os.getenv(
-            'DB_ENGINE',
-            default='django.db.backends.postgresql'
-        ),
+        'ENGINE': os.getenv('DB_ENGINE', default='backend.db'),
         'NAME': os.getenv('DB_NAME', default='postgres'),
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
         'PORT': os.getenv('DB_PORT', default=5432),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
+        'CONN_HEALTH_CHECKS': (
+            os.getenv('DB_CONN_HEALTH_CHECKS', default='True') == 'True'
+        ),
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', default=0)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', default=10)),
+        },
+    },
+}
+
+if DATABASES['default']['POOL']['MAX_SIZE']:
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
+SEARCH_TRIGRAM_THRESHOLD = float(
+    os.getenv('SEARCH_TRIGRAM_THRESHOLD', default=0.3)
+)
+
+if 'sqlite' not in DATABASES['default']['ENGINE']:
+    DATABASES['default']['OPTIONS'] = {
+        'options': (
+            f'-c pg_trgm.similarity_threshold={SEARCH_TRIGRAM_THRESHOLD}'
+        ),
+    }
+
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.memcached.PyMemcacheCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default='memcached:11211'),
     },
 }
 
@@ -164,3 +199,31 @@ CSRF_TRUSTED_ORIGINS = ['http://127.0.0.1']
 EMPTY_VALUE = os.getenv('EMPTY_VALUE', default='--пусто--')
 
 STANDARD_INGREDIENT_QUANTITY = int(os.getenv('INGREDIENT_QUANTITY', default=3))
+
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', default=3600))
+
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', default=300))
+
+CATALOG_CACHE_MAX_AGE = int(os.getenv('CATALOG_CACHE_MAX_AGE', default=0))
+
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', default=2))
+
+IMAGE_FORMAT = os.getenv('IMAGE_FORMAT', default='WEBP')
+
+IMAGE_MAX_SIDE = int(os.getenv('IMAGE_MAX_SIDE', default=1600))
+
+IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', default=85))
+
+IMAGE_MAX_UPLOAD_SIZE = int(
+    os.getenv('IMAGE_MAX_UPLOAD_SIZE', default=10 * 1024 * 1024)
+)
+
+FEED_CACHE_TIMEOUT = int(os.getenv('FEED_CACHE_TIMEOUT', default=300))
+
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', default=0.1))
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+
+METRICS_DIR = os.getenv('METRICS_DIR', default='/tmp/foodgram-metrics')
+
+RELATIONS_CACHE_TIMEOUT = int(os.getenv('RELATIONS_CACHE_TIMEOUT', default=60))
@@ -3,9 +3,17 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from recipes.views import image_variant
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
+    path(
+        f'{settings.MEDIA_URL.strip("/")}/recipes/variants/'
+        '<str:variant>/<str:name>',
+        image_variant,
+        name='image-variant'
+    ),
 ]
 
 if settings.DEBUG:
@@ -4,4 +4,5 @@ python manage.py makemigrations users
 python manage.py makemigrations recipes
 python manage.py migrate
 python manage.py collectstatic
-python ./manage.py loaddata db.json
\ No newline at end of file
+python ./manage.py loaddata db.json
+python manage.py recount_counters
\ No newline at end of file
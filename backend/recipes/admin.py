@@ -1,8 +1,11 @@
 from django.conf import settings
 from django.contrib import admin
 
-from api.models import Favorite
+from api.counters import change_counter
+from api.models import ShoppingListItem
+from recipes.images import release_image
 from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import User
 
 EMPTY_VALUE = settings.EMPTY_VALUE
 STANDARD_INGREDIENT_QUANTITY = settings.STANDARD_INGREDIENT_QUANTITY
@@ -56,7 +59,48 @@ class RecipeAdmin(admin.ModelAdmin):
     readonly_fields = ['favorited']
     empty_value_display = EMPTY_VALUE
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            change_counter(
+                User.objects.filter(id=obj.author_id), 'recipes_count', 1
+            )
+        elif 'image' in form.changed_data and form.initial.get('image'):
+            release_image(form.initial['image'].name)
+
+    def save_related(self, request, form, formsets, change):
+        recipe = form.instance
+        old_amounts = dict(
+            recipe.recipe_amount.values_list('ingredient_id', 'amount')
+        )
+        super().save_related(request, form, formsets, change)
+        ShoppingListItem.objects.change_recipe(
+            recipe.id,
+            old_amounts,
+            dict(recipe.recipe_amount.values_list('ingredient_id', 'amount'))
+        )
+
+    def delete_model(self, request, obj):
+        ShoppingListItem.objects.delete_recipe(obj.id)
+        change_counter(
+            User.objects.filter(id=obj.author_id), 'recipes_count', -1
+        )
+        super().delete_model(request, obj)
+        release_image(obj.image.name)
+
+    def delete_queryset(self, request, queryset):
+        images = list(queryset.values_list('image', flat=True))
+        for recipe_id, author_id in queryset.values_list('id', 'author_id'):
+            ShoppingListItem.objects.delete_recipe(recipe_id)
+            change_counter(
+                User.objects.filter(id=author_id), 'recipes_count', -1
+            )
+        super().delete_queryset(request, queryset)
+        for image in images:
+            release_image(image)
+
     def favorited(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
+        return obj.favorites_count
 
     favorited.short_description = 'В избранном'
+    favorited.admin_order_field = 'favorites_count'
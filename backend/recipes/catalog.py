@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from recipes.models import Tag
+
+INGREDIENTS_VERSION_KEY = 'catalog:ingredients:version'
+TAGS_VERSION_KEY = 'catalog:tags:version'
+FEED_VERSION_KEY = 'feed:recipes:version'
+RECIPE_TAG_INDEX = (
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_tags_tag_recipe '
+    'ON recipes_recipe_tags (tag_id, recipe_id)'
+)
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+        return 2
+
+
+def get_tag_ids(slugs):
+    key = f'{TAGS_VERSION_KEY}:slugs:{get_version(TAGS_VERSION_KEY)}'
+    tag_ids = cache.get(key)
+    if tag_ids is None:
+        tag_ids = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, tag_ids, settings.CATALOG_CACHE_TIMEOUT)
+    return [tag_ids[slug] for slug in slugs if slug in tag_ids]
+
+
+def install_tag_index(using=connection):
+    with using.cursor() as cursor:
+        cursor.execute(RECIPE_TAG_INDEX)
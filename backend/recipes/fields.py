@@ -1,17 +1,38 @@
-import base64
-import uuid
-
-from django.core.files.base import ContentFile
+from django.conf import settings
 from rest_framework import serializers
 
+from recipes.images import ALLOWED_EXTENSIONS, PendingImage, variant_urls
+from recipes.models import Recipe
+
 
 class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            id = uuid.uuid4()
-            data = ContentFile(
-                base64.b64decode(imgstr), name=id.urn[9:] + '.' + ext
-            )
+            try:
+                format, imgstr = data.split(';base64,')
+            except ValueError:
+                raise serializers.ValidationError(
+                    'Некорректный формат изображения.'
+                )
+            ext = format.split('/')[-1].lower()
+            if ext not in ALLOWED_EXTENSIONS:
+                raise serializers.ValidationError(
+                    f'Недопустимый тип изображения: {ext}.'
+                )
+            if len(imgstr) > settings.IMAGE_MAX_UPLOAD_SIZE * 4 // 3 + 4:
+                raise serializers.ValidationError(
+                    'Слишком большое изображение.'
+                )
+            return PendingImage(imgstr, ext)
         return super().to_internal_value(data)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if recipe.image_status != Recipe.IMAGE_READY or not recipe.image:
+            return None
+        return variant_urls(recipe.image.name)
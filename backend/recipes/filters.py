@@ -1,35 +1,36 @@
-import django_filters as filters
-from rest_framework.filters import SearchFilter
+from rest_framework.filters import (
+    BaseFilterBackend,
+    OrderingFilter,
+    SearchFilter
+)
 
-from .models import Recipe, Tag
+from .search import search_recipes
 
 
-class RecipeFilter(filters.FilterSet):
-    author = filters.NumberFilter(
-        field_name='author__id',
-        lookup_expr='exact'
-    )
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all()
-    )
-    is_favorited = filters.BooleanFilter(
-        field_name='is_favorited'
-    )
-    is_in_shopping_cart = filters.BooleanFilter(
-        field_name='is_in_shopping_cart'
-    )
+class IngredientFilter(SearchFilter):
+    search_param = 'name'
 
-    class Meta:
-        model = Recipe
-        fields = (
-            'author',
-            'tags',
-            'is_favorited',
-            'is_in_shopping_cart'
+
+class RecipeSearchFilter(BaseFilterBackend):
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        return search_recipes(
+            queryset,
+            request.query_params.get(self.search_param, '')
         )
 
 
-class IngredientFilter(SearchFilter):
-    search_param = 'name'
+class RecipeOrderingFilter(OrderingFilter):
+    ordering_fields = (
+        'id',
+        'cooking_time',
+        'favorites_count',
+        'in_carts_count'
+    )
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering is None:
+            return None
+        return (*ordering, '-id')
@@ -0,0 +1,264 @@
+import base64
+import binascii
+import logging
+import os
+import posixpath
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+from time import perf_counter, time
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from recipes.catalog import FEED_VERSION_KEY, bump_version
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_EXTENSIONS = ('png', 'jpeg', 'jpg', 'gif', 'webp', 'bmp')
+EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+IMAGE_VARIANTS = {
+    'thumb': 160,
+    'card': 480,
+}
+FULL_VARIANT = 'full'
+VARIANTS_DIR = 'variants'
+UPLOADS_DIR = 'uploads'
+VARIANT_LOCKS = [Lock() for _ in range(32)]
+REUSE_GRACE = 60
+
+
+class PendingImage:
+    def __init__(self, payload, ext=None):
+        self.payload = payload
+        self.ext = ext
+
+
+class ImagePool:
+    def __init__(self):
+        self._lock = Lock()
+        self._executor = None
+        self.stats = {
+            'submitted': 0,
+            'in_progress': 0,
+            'completed': 0,
+            'failed': 0,
+            'busy_seconds': 0.0,
+        }
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_WORKERS,
+                    thread_name_prefix='recipe-image'
+                )
+            return self._executor
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    def _run(self, recipe_id, name, image, old_name):
+        self._count('in_progress')
+        started = perf_counter()
+        try:
+            if handle_recipe_image(recipe_id, name, image, old_name):
+                self._count('completed')
+            else:
+                self._count('failed')
+        finally:
+            self._count('in_progress', -1)
+            self._count('busy_seconds', perf_counter() - started)
+            if settings.IMAGE_WORKERS:
+                connection.close()
+
+    def submit(self, recipe_id, name, image, old_name=None):
+        self._count('submitted')
+        if settings.IMAGE_WORKERS:
+            self._get_executor().submit(
+                self._run, recipe_id, name, image, old_name
+            )
+        else:
+            self._run(recipe_id, name, image, old_name)
+
+
+image_pool = ImagePool()
+
+
+def pending_image_name():
+    return Recipe.image.field.generate_filename(
+        None,
+        f'{uuid.uuid4().hex}.{EXTENSIONS[settings.IMAGE_FORMAT]}'
+    )
+
+
+def upload_name(name):
+    return posixpath.join(UPLOADS_DIR, posixpath.basename(name) + '.b64')
+
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(
+        dir=os.path.dirname(path),
+        suffix='.tmp'
+    )
+    with os.fdopen(descriptor, 'wb') as output:
+        output.write(data)
+    os.replace(temporary, path)
+
+
+def save_upload(name, image):
+    storage = Recipe.image.field.storage
+    write_file(storage.path(upload_name(name)), image.payload.encode())
+
+
+def load_upload(name):
+    storage = Recipe.image.field.storage
+    with open(storage.path(upload_name(name)), 'rb') as upload:
+        return PendingImage(upload.read().decode())
+
+
+def delete_upload(name):
+    storage = Recipe.image.field.storage
+    try:
+        os.remove(storage.path(upload_name(name)))
+    except FileNotFoundError:
+        pass
+
+
+def resize_image(image, max_side, image_format):
+    image.thumbnail((max_side, max_side))
+    if image.mode not in ('RGB', 'RGBA') or (
+            image_format == 'JPEG' and image.mode == 'RGBA'):
+        image = image.convert('RGB')
+    output = BytesIO()
+    image.save(output, image_format, quality=settings.IMAGE_QUALITY)
+    return output.getvalue()
+
+
+def encode_image(raw):
+    with Image.open(BytesIO(raw)) as image:
+        image.verify()
+    with Image.open(BytesIO(raw)) as image:
+        return resize_image(
+            ImageOps.exif_transpose(image),
+            settings.IMAGE_MAX_SIDE,
+            settings.IMAGE_FORMAT
+        )
+
+
+def variant_name(name, variant):
+    directory, filename = posixpath.split(name)
+    return posixpath.join(directory, VARIANTS_DIR, variant, filename)
+
+
+def variant_urls(name):
+    storage = Recipe.image.field.storage
+    urls = {
+        variant: storage.url(variant_name(name, variant))
+        for variant in IMAGE_VARIANTS
+    }
+    urls[FULL_VARIANT] = storage.url(name)
+    return urls
+
+
+def ensure_variant(name, variant):
+    storage = Recipe.image.field.storage
+    target = variant_name(name, variant)
+    if storage.exists(target):
+        return target
+    with VARIANT_LOCKS[hash(target) % len(VARIANT_LOCKS)]:
+        if storage.exists(target):
+            return target
+        with storage.open(name) as source, Image.open(source) as image:
+            data = resize_image(
+                image,
+                IMAGE_VARIANTS[variant],
+                Image.registered_extensions()[
+                    posixpath.splitext(name)[1].lower()
+                ]
+            )
+        write_file(storage.path(target), data)
+    return target
+
+
+def process_recipe_image(recipe_id, name, image, old_name=None):
+    try:
+        raw = base64.b64decode(image.payload, validate=True)
+    except binascii.Error as error:
+        raise ValueError('Некорректные данные base64') from error
+    storage = Recipe.image.field.storage
+    stored_name = storage.save(name, ContentFile(encode_image(raw)))
+    for variant in IMAGE_VARIANTS:
+        ensure_variant(stored_name, variant)
+    updated = Recipe.objects.filter(id=recipe_id, image=name).update(
+        image=stored_name,
+        image_status=Recipe.IMAGE_READY
+    )
+    if not updated:
+        delete_unreferenced(stored_name)
+    delete_unreferenced(old_name)
+    bump_version(FEED_VERSION_KEY)
+
+
+def handle_recipe_image(recipe_id, name, image, old_name=None):
+    try:
+        process_recipe_image(recipe_id, name, image, old_name)
+    except Exception:
+        logger.exception('Не удалось обработать изображение рецепта')
+        Recipe.objects.filter(id=recipe_id, image=name).update(
+            image_status=Recipe.IMAGE_FAILED
+        )
+        bump_version(FEED_VERSION_KEY)
+        return False
+    finally:
+        delete_upload(name)
+    return True
+
+
+def delete_unreferenced(name):
+    if not name:
+        return False
+    storage = Recipe.image.field.storage
+    with storage.lock(name):
+        if Recipe.objects.filter(image=name).exists():
+            return False
+        try:
+            if time() - os.path.getmtime(storage.path(name)) < REUSE_GRACE:
+                return False
+        except FileNotFoundError:
+            pass
+        for variant in IMAGE_VARIANTS:
+            storage.delete(variant_name(name, variant))
+        storage.delete(name)
+    return True
+
+
+def release_image(name):
+    transaction.on_commit(lambda: delete_unreferenced(name))
+
+
+def assign_image(recipe, image):
+    if isinstance(image, PendingImage):
+        recipe.image = pending_image_name()
+        recipe.image_status = Recipe.IMAGE_PENDING
+    else:
+        recipe.image = image
+        recipe.image_status = Recipe.IMAGE_READY
+
+
+def enqueue_image(recipe, image, old_name=None):
+    if isinstance(image, PendingImage):
+        name = recipe.image.name
+        save_upload(name, image)
+        transaction.on_commit(
+            lambda: image_pool.submit(recipe.id, name, image, old_name)
+        )
+    elif old_name:
+        release_image(old_name)
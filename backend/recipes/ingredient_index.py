@@ -0,0 +1,64 @@
+from bisect import bisect_left
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+
+from recipes.catalog import INGREDIENTS_VERSION_KEY, get_version
+from recipes.models import Ingredient
+
+
+def normalize(value):
+    return value.casefold().replace('ё', 'е').strip()
+
+
+class IngredientIndex:
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._expires_at = 0.0
+        self._entries = ([], [])
+
+    def _build(self):
+        entries = sorted(
+            (normalize(name), pk, name, measurement_unit)
+            for pk, name, measurement_unit in (
+                Ingredient.objects.values_list(
+                    'id', 'name', 'measurement_unit'
+                ).iterator()
+            )
+        )
+        return (
+            [entry[0] for entry in entries],
+            [
+                {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+                for _, pk, name, measurement_unit in entries
+            ]
+        )
+
+    def _is_fresh(self, version):
+        return version == self._version and monotonic() < self._expires_at
+
+    def _ensure_fresh(self):
+        version = get_version(INGREDIENTS_VERSION_KEY)
+        if self._is_fresh(version):
+            return
+        with self._lock:
+            if not self._is_fresh(version):
+                self._entries = self._build()
+                self._version = version
+                self._expires_at = monotonic() + settings.INGREDIENT_INDEX_TTL
+
+    def search(self, prefix='', limit=None):
+        self._ensure_fresh()
+        keys, items = self._entries
+        prefix = normalize(prefix)
+        start = bisect_left(keys, prefix)
+        end = start
+        stop = len(keys) if limit is None else min(len(keys), start + limit)
+        while end < stop and keys[end].startswith(prefix):
+            end += 1
+        return items[start:end]
+
+
+ingredient_index = IngredientIndex()
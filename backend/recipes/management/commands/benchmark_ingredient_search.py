@@ -0,0 +1,41 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+PREFIXES = ('а', 'мо', 'мяс', 'сах', 'к', 'пом', 'сы', 'ч', 'хле', 'я')
+
+
+class Command(BaseCommand):
+    help = 'Сравнение поиска ингредиентов по индексу в памяти и через БД.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=100)
+
+    @staticmethod
+    def measure(search, repeat):
+        started = perf_counter()
+        for _ in range(repeat):
+            for prefix in PREFIXES:
+                search(prefix)
+        return (perf_counter() - started) / (repeat * len(PREFIXES))
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        ingredient_index.search()
+        results = {
+            'БД (istartswith)': self.measure(
+                lambda prefix: list(Ingredient.objects.filter(
+                    name__istartswith=prefix
+                ).values('id', 'name', 'measurement_unit')),
+                repeat
+            ),
+            'Индекс в памяти': self.measure(
+                ingredient_index.search,
+                repeat
+            ),
+        }
+        for name, seconds in results.items():
+            self.stdout.write(f'{name}: {seconds * 1e6:.1f} мкс на запрос')
@@ -0,0 +1,58 @@
+import os
+import posixpath
+from time import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.images import VARIANTS_DIR
+from recipes.models import Recipe
+
+IMAGES_DIR = 'recipes'
+
+
+def scan_files(path):
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from scan_files(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry
+
+
+class Command(BaseCommand):
+    help = 'Удаление изображений, на которые не ссылается ни один рецепт.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=3600)
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        storage = Recipe.image.field.storage
+        root = storage.path(IMAGES_DIR)
+        if not os.path.isdir(root):
+            return
+        referenced = set(
+            Recipe.objects.values_list('image', flat=True).iterator()
+        )
+        variants_root = os.path.join(root, VARIANTS_DIR)
+        deadline = time() - options['min_age']
+        removed = freed = 0
+        for entry in scan_files(root):
+            if entry.path.startswith(variants_root + os.sep):
+                name = posixpath.join(IMAGES_DIR, entry.name)
+            else:
+                name = posixpath.join(
+                    IMAGES_DIR,
+                    os.path.relpath(entry.path, root).replace(os.sep, '/')
+                )
+            stat = entry.stat(follow_symlinks=False)
+            if name in referenced or stat.st_mtime > deadline:
+                continue
+            removed += 1
+            freed += stat.st_size
+            if not options['dry_run']:
+                os.remove(entry.path)
+        self.stdout.write(
+            f'{"Найдено" if options["dry_run"] else "Удалено"} файлов: '
+            f'{removed}, {freed / 1024 / 1024:.1f} МБ.'
+        )
@@ -1,18 +1,96 @@
+import json
 from csv import reader
+from time import perf_counter
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
+from recipes.catalog import INGREDIENTS_VERSION_KEY, bump_version
 from recipes.models import Ingredient
 
+DEFAULT_PATH = 'data/ingredients.csv'
+BATCH_SIZE = 1000
+
+
+def read_csv(file):
+    for row in reader(file):
+        if len(row) == 2:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    for item in json.load(file):
+        yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
 
 class Command(BaseCommand):
-    help = 'Загрузка ингредиентов из csv-файла.'
-
-    def handle(self, *args, **kwargs):
-        with open(
-                'data/ingredients.csv', 'r', encoding='UTF-8') as ingredients:
-            for row in reader(ingredients):
-                if len(row) == 2:
-                    Ingredient.objects.get_or_create(
-                        name=row[0], measurement_unit=row[1],
-                    )
+    help = 'Загрузка ингредиентов из csv- или json-файла.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=DEFAULT_PATH,
+            help=f'Путь к файлу (по умолчанию {DEFAULT_PATH}).'
+        )
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='Формат файла; по умолчанию определяется по расширению.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Прочитать файл и отчитаться, ничего не записывая.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        batch_size = options['batch_size']
+        started = perf_counter()
+        seen = set()
+        rows = 0
+        before = Ingredient.objects.count()
+        with open(path, 'r', encoding='UTF-8') as file, transaction.atomic():
+            batch = []
+            for name, measurement_unit in READERS[file_format](file):
+                rows += 1
+                key = (name.strip(), measurement_unit.strip())
+                if key in seen:
+                    continue
+                seen.add(key)
+                batch.append(
+                    Ingredient(name=key[0], measurement_unit=key[1])
+                )
+                if len(batch) == batch_size:
+                    self.write_batch(batch, options['dry_run'], rows)
+                    batch = []
+            self.write_batch(batch, options['dry_run'], rows)
+        elapsed = perf_counter() - started
+        created = Ingredient.objects.count() - before
+        if not options['dry_run'] and created:
+            bump_version(INGREDIENTS_VERSION_KEY)
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк прочитано: {rows}, уникальных: {len(seen)}, '
+            f'добавлено: {created}, '
+            f'{rows / elapsed if elapsed else rows:.0f} строк/с.'
+        ))
+
+    def write_batch(self, batch, dry_run, rows):
+        if batch and not dry_run:
+            Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+        self.stdout.write(f'Обработано строк: {rows}')
@@ -0,0 +1,68 @@
+import os
+import posixpath
+from time import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.catalog import FEED_VERSION_KEY, bump_version
+from recipes.images import (
+    UPLOADS_DIR,
+    handle_recipe_image,
+    load_upload,
+    upload_name
+)
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Повторная обработка изображений рецептов, оставшихся '
+        'в состоянии «обрабатывается» после перезапуска сервера, '
+        'и удаление брошенных загрузок.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=600)
+
+    def handle(self, *args, **options):
+        storage = Recipe.image.field.storage
+        deadline = time() - options['min_age']
+        pending = {
+            upload_name(name): (recipe_id, name)
+            for recipe_id, name in Recipe.objects.filter(
+                image_status=Recipe.IMAGE_PENDING
+            ).values_list('id', 'image')
+        }
+        processed = failed = removed = 0
+        for upload, (recipe_id, name) in pending.items():
+            try:
+                if os.path.getmtime(storage.path(upload)) > deadline:
+                    continue
+                image = load_upload(name)
+            except FileNotFoundError:
+                if Recipe.objects.filter(
+                    id=recipe_id,
+                    image=name,
+                    image_status=Recipe.IMAGE_PENDING
+                ).update(image_status=Recipe.IMAGE_FAILED):
+                    bump_version(FEED_VERSION_KEY)
+                    failed += 1
+                continue
+            if handle_recipe_image(recipe_id, name, image):
+                processed += 1
+            else:
+                failed += 1
+        root = storage.path(UPLOADS_DIR)
+        if os.path.isdir(root):
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    if (posixpath.join(UPLOADS_DIR, entry.name) in pending
+                            or not entry.is_file(follow_symlinks=False)
+                            or entry.stat().st_mtime > deadline):
+                        continue
+                    os.remove(entry.path)
+                    removed += 1
+        self.stdout.write(
+            f'Обработано изображений: {processed}, ошибок: {failed}, '
+            f'удалено брошенных загрузок: {removed}.'
+        )
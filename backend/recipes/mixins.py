@@ -0,0 +1,93 @@
+from hashlib import md5
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+
+from recipes.catalog import get_version
+from recipes.page_cache import page_cache
+
+
+class VersionedCatalogMixin:
+    version_key = None
+    authentication_classes = ()
+
+    def get_cache_variant(self, request):
+        return ''
+
+    def get_catalog_data(self, request):
+        return self.get_serializer(self.get_queryset(), many=True).data
+
+    def list(self, request, *args, **kwargs):
+        version = get_version(self.version_key)
+        cache_key = (
+            f'{self.version_key}:body:{version}:'
+            f'{md5(self.get_cache_variant(request).encode()).hexdigest()}'
+        )
+        entry = cache.get(cache_key)
+        if entry is None:
+            body = JSONRenderer().render(self.get_catalog_data(request))
+            entry = (f'"{md5(body).hexdigest()}"', body)
+            cache.set(cache_key, entry, settings.CATALOG_CACHE_TIMEOUT)
+        etag, body = entry
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = (
+            f'public, max-age={settings.CATALOG_CACHE_MAX_AGE}, '
+            'must-revalidate'
+        )
+        return response
+
+
+class AnonymousPageCacheMixin:
+    vary_headers = ('Accept', 'Authorization')
+    cached_headers = ('ETag', 'Vary')
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if (request.user.is_authenticated
+                or request.accepted_renderer.format != 'json'):
+            response = handler(request, *args, **kwargs)
+            patch_vary_headers(response, self.vary_headers)
+            return response
+        response = None
+
+        def build():
+            nonlocal response
+            response = handler(request, *args, **kwargs)
+            patch_vary_headers(response, self.vary_headers)
+            if response.status_code != 200:
+                return None
+            body = JSONRenderer().render(response.data)
+            response['ETag'] = f'"{md5(body).hexdigest()}"'
+            return [
+                (header, response[header])
+                for header in self.cached_headers
+                if response.has_header(header)
+            ], body
+
+        entry, hit = page_cache.get_or_build(request, build)
+        if entry is None:
+            return response
+        headers, body = entry
+        etag = dict(headers).get('ETag')
+        if etag and etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        for header, value in headers:
+            response[header] = value
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
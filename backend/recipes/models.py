@@ -1,7 +1,19 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models import (
+    BooleanField,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Value,
+    Window
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 
+from recipes.storage import ContentAddressedStorage
 from recipes.validators import latin_alphabet_number_validator
 
 User = get_user_model()
@@ -125,6 +137,12 @@ class Ingredient(models.Model):
 
     class Meta:
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
 
@@ -132,7 +150,65 @@ class Ingredient(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            return self.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField())
+            )
+        from api.models import Favorite, Purchase
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe_id=OuterRef('id')
+            )),
+            is_in_shopping_cart=Exists(Purchase.objects.filter(
+                user=user, recipe_id=OuterRef('id')
+            ))
+        )
+
+    def with_tags(self, tag_ids):
+        return self.filter(Exists(self.model.tags.through.objects.filter(
+            recipe_id=OuterRef('id'),
+            tag_id__in=tag_ids
+        )))
+
+    def with_read_relations(self):
+        return self.select_related('author').prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.all()),
+            Prefetch(
+                'recipe_amount',
+                queryset=IngredientRecipe.objects.select_related('ingredient')
+            )
+        )
+
+    def latest_per_author(self, limit):
+        ranked = self.order_by().annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=F('author'),
+                order_by=F('id').desc()
+            )
+        ).values('id', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        return self.filter(id__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            f'WHERE ranked.row_number <= %s',
+            (*params, limit)
+        ))
+
+
 class Recipe(models.Model):
+    IMAGE_PENDING = 'pending'
+    IMAGE_READY = 'ready'
+    IMAGE_FAILED = 'failed'
+
+    IMAGE_STATUS_CHOICES = (
+        (IMAGE_PENDING, 'Обрабатывается'),
+        (IMAGE_READY, 'Готово'),
+        (IMAGE_FAILED, 'Ошибка обработки'),
+    )
+
     author = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
@@ -146,8 +222,15 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         upload_to='recipes/',
+        storage=ContentAddressedStorage(),
         verbose_name='Изображение'
     )
+    image_status = models.CharField(
+        max_length=16,
+        choices=IMAGE_STATUS_CHOICES,
+        default=IMAGE_READY,
+        verbose_name='Состояние изображения'
+    )
     text = models.TextField(
         verbose_name='Описание'
     )
@@ -170,6 +253,18 @@ class Recipe(models.Model):
         ],
         verbose_name='Время приготовления'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ['-id']
@@ -187,7 +282,8 @@ class IngredientRecipe(models.Model):
     recipe = models.ForeignKey(
         Recipe, on_delete=models.CASCADE,
         verbose_name='В составе рецепта',
-        related_name='recipe_amount'
+        related_name='recipe_amount',
+        db_index=False
     )
     amount = models.IntegerField(
         validators=[
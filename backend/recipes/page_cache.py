@@ -0,0 +1,87 @@
+import logging
+from hashlib import md5
+from threading import Lock
+from time import monotonic, sleep
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.catalog import FEED_VERSION_KEY, get_version
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = 10
+WAIT_INTERVAL = 0.05
+LOG_EVERY = 1000
+
+
+class PageCache:
+    def __init__(self):
+        self._lock = Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'waits': 0,
+        }
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+            lookups = self.stats['hits'] + self.stats['misses']
+            if key != 'waits' and lookups % LOG_EVERY == 0:
+                logger.info(
+                    'Кэш ленты рецептов: %d запросов, попаданий %.1f%%',
+                    lookups,
+                    100 * self.stats['hits'] / lookups
+                )
+
+    @property
+    def hit_ratio(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    @staticmethod
+    def make_key(request):
+        query = urlencode(
+            [
+                (name, sorted(values))
+                for name, values in sorted(request.GET.lists())
+            ],
+            doseq=True
+        )
+        digest = md5(
+            f'{request.scheme}://{request.get_host()}'
+            f'{request.path}?{query}'.encode()
+        ).hexdigest()
+        return f'{FEED_VERSION_KEY}:{get_version(FEED_VERSION_KEY)}:{digest}'
+
+    def get_or_build(self, request, build):
+        key = self.make_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            self._count('hits')
+            return entry, True
+        lock_key = f'{key}:lock'
+        deadline = monotonic() + LOCK_TIMEOUT
+        locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+        while not locked and monotonic() < deadline:
+            self._count('waits')
+            sleep(WAIT_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                self._count('hits')
+                return entry, True
+            locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+        self._count('misses')
+        try:
+            entry = build()
+            if entry is not None:
+                cache.set(key, entry, settings.FEED_CACHE_TIMEOUT)
+        finally:
+            if locked:
+                cache.delete(lock_key)
+        return entry, False
+
+
+page_cache = PageCache()
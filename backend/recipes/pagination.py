@@ -1,7 +1,45 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from recipes.filters import RecipeOrderingFilter
 
 PAGE_SIZE = 6
+MAX_PAGE_SIZE = 100
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class RecipeCursorPagination(CursorPagination):
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        if 'search_rank' in queryset.query.annotations:
+            return ('-search_rank', '-id')
+        return RecipeOrderingFilter().get_ordering(
+            request, queryset, view
+        ) or (self.ordering, )
+
+
+class RecipePagination(LimitPageNumberPagination):
+    mode_query_param = 'pagination'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_pagination = None
+        if (request.query_params.get(self.mode_query_param) == 'cursor'
+                or RecipeCursorPagination.cursor_query_param
+                in request.query_params):
+            self.cursor_pagination = RecipeCursorPagination()
+            return self.cursor_pagination.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_pagination is not None:
+            return self.cursor_pagination.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,100 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+
+POSTGRESQL_SCHEMA = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'ALTER TABLE recipes_recipe ADD COLUMN IF NOT EXISTS search_vector '
+    'tsvector GENERATED ALWAYS AS ('
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(text, '')), 'B')"
+    ') STORED',
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_gin '
+    'ON recipes_recipe USING gin (search_vector)',
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_name_trgm '
+    'ON recipes_recipe USING gin (name gin_trgm_ops)',
+)
+
+SQLITE_SCHEMA = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+    "name, text, content='recipes_recipe', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai '
+    'AFTER INSERT ON recipes_recipe BEGIN '
+    f'INSERT INTO {FTS_TABLE}(rowid, name, text) '
+    'VALUES (new.id, new.name, new.text); END',
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad '
+    'AFTER DELETE ON recipes_recipe BEGIN '
+    f'INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text) '
+    "VALUES ('delete', old.id, old.name, old.text); END",
+    f'CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au '
+    'AFTER UPDATE ON recipes_recipe BEGIN '
+    f'INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, text) '
+    "VALUES ('delete', old.id, old.name, old.text); "
+    f'INSERT INTO {FTS_TABLE}(rowid, name, text) '
+    'VALUES (new.id, new.name, new.text); END',
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+
+def install_search_schema(using=connection):
+    schema = {
+        'postgresql': POSTGRESQL_SCHEMA,
+        'sqlite': SQLITE_SCHEMA,
+    }.get(using.vendor, ())
+    with using.cursor() as cursor:
+        for statement in schema:
+            cursor.execute(statement)
+
+
+def search_postgresql(queryset, term):
+    return queryset.annotate(
+        search_match=RawSQL(
+            'recipes_recipe.search_vector @@ '
+            f"websearch_to_tsquery('{SEARCH_CONFIG}', %s) "
+            'OR recipes_recipe.name %% %s',
+            (term, term),
+            output_field=BooleanField()
+        ),
+        search_rank=RawSQL(
+            'ts_rank(recipes_recipe.search_vector, '
+            f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)) "
+            '+ similarity(recipes_recipe.name, %s)',
+            (term, term),
+            output_field=FloatField()
+        )
+    ).filter(search_match=True).order_by('-search_rank', '-id')
+
+
+def search_sqlite(queryset, term):
+    words = re.findall(r'\w+', term)
+    if not words:
+        return queryset
+    match = ' '.join(f'"{word}"*' for word in words)
+    return queryset.filter(id__in=RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        (match, )
+    )).annotate(
+        search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = recipes_recipe.id',
+            (match, ),
+            output_field=FloatField()
+        )
+    ).order_by('-search_rank', '-id')
+
+
+def search_recipes(queryset, term):
+    term = term.strip()
+    if not term:
+        return queryset
+    if connection.vendor == 'postgresql':
+        return search_postgresql(queryset, term)
+    if connection.vendor == 'sqlite':
+        return search_sqlite(queryset, term)
+    return queryset.filter(name__icontains=term)
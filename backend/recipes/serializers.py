@@ -1,14 +1,19 @@
+from collections import Counter
+
+from django.db import transaction
 from rest_framework.serializers import (
     IntegerField,
+    ListField,
     ModelSerializer,
-    PrimaryKeyRelatedField,
     ReadOnlyField,
     SerializerMethodField,
     ValidationError
 )
 
-from api.models import Purchase
-from recipes.fields import Base64ImageField
+from api.models import ShoppingListItem
+from api.relations import user_relations
+from recipes.fields import Base64ImageField, ImageVariantsField
+from recipes.images import assign_image, enqueue_image
 from recipes.models import (
     Ingredient,
     IngredientRecipe,
@@ -71,9 +76,8 @@ class IngredientRecipeWriteSerializer(ModelSerializer):
 
 class RecipeWriteSerializer(ModelSerializer):
     image = Base64ImageField()
-    tags = PrimaryKeyRelatedField(
-        many=True,
-        queryset=Tag.objects.all()
+    tags = ListField(
+        child=IntegerField()
     )
     ingredients = IngredientRecipeWriteSerializer(
         many=True,
@@ -83,44 +87,53 @@ class RecipeWriteSerializer(ModelSerializer):
     class Meta:
         model = Recipe
         fields = '__all__'
-        read_only_fields = ('author',)
+        read_only_fields = ('author', 'image_status')
+
+    @staticmethod
+    def fetch_objects(model, ids, message):
+        duplicates = sorted(
+            pk for pk, count in Counter(ids).items() if count > 1
+        )
+        if duplicates:
+            raise ValidationError(
+                f'{message} с ID={duplicates} не должны повторяться'
+            )
+        objects = model.objects.in_bulk(ids)
+        missing = [pk for pk in ids if pk not in objects]
+        if missing:
+            raise ValidationError(f'{message} с ID={missing} не существуют')
+        return objects
 
-    def validate(self, data):
-        ingredients = data['ingredients']
+    def validate_ingredients(self, ingredients):
         if not ingredients:
             raise ValidationError(
-                {'ingredients': 'Добавьте не менее 1 ингредиента для рецепта'}
+                'Добавьте не менее 1 ингредиента для рецепта'
             )
-        ingredients_set = set()
         for ingredient in ingredients:
-            if ingredient['id'] in ingredients_set:
-                raise ValidationError(
-                    f'Ингредиент с ID={ingredient["id"]} не должен повторяться'
-                )
             if ingredient['amount'] < 1:
                 raise ValidationError(
-                    f'Количество ингредиента {ingredient["name"]}'
-                    f' не может быть отрицательным'
+                    f'Количество ингредиента с ID={ingredient["id"]}'
+                    f' должно быть больше 0'
                 )
-            ingredients_set.add(ingredient['id'])
-        data['ingredients'] = ingredients
-        tags = data['tags']
-        tags_set = set()
-        for tag in tags:
-            if tag in tags_set:
-                raise ValidationError(
-                    f'Тег с ID={tag} не должен повторяться'
-                )
-            tags_set.add(tag)
-        data['tags'] = tags
-        return data
+        objects = self.fetch_objects(
+            Ingredient,
+            [ingredient['id'] for ingredient in ingredients],
+            'Ингредиенты'
+        )
+        for ingredient in ingredients:
+            ingredient['ingredient'] = objects[ingredient['id']]
+        return ingredients
+
+    def validate_tags(self, tags):
+        objects = self.fetch_objects(Tag, tags, 'Теги')
+        return [objects[pk] for pk in tags]
 
     @staticmethod
     def add_ingredients(ingredients, recipe):
-        IngredientRecipe.objects.bulk_create(
+        return IngredientRecipe.objects.bulk_create(
             [
                 IngredientRecipe(
-                    ingredient_id=ingredient['id'],
+                    ingredient=ingredient['ingredient'],
                     recipe=recipe,
                     amount=ingredient['amount'],
                 ) for ingredient in ingredients
@@ -128,51 +141,122 @@ class RecipeWriteSerializer(ModelSerializer):
         )
 
     @staticmethod
-    def add_tags(tags, recipe):
-        for tag in tags:
-            recipe.tags.add(tag)
+    def update_ingredients(ingredients, recipe):
+        current = {
+            item.ingredient_id: item for item in recipe.recipe_amount.all()
+        }
+        old_amounts = {
+            ingredient_id: item.amount
+            for ingredient_id, item in current.items()
+        }
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        removed = current.keys() - amounts.keys()
+        if removed:
+            IngredientRecipe.objects.filter(
+                recipe=recipe,
+                ingredient_id__in=removed
+            ).delete()
+        changed = []
+        items = []
+        for ingredient in ingredients:
+            item = current.get(ingredient['id'])
+            if item is None:
+                continue
+            item.ingredient = ingredient['ingredient']
+            items.append(item)
+            if item.amount != ingredient['amount']:
+                item.amount = ingredient['amount']
+                changed.append(item)
+        if changed:
+            IngredientRecipe.objects.bulk_update(changed, ['amount'])
+        items += RecipeWriteSerializer.add_ingredients(
+            [
+                ingredient for ingredient in ingredients
+                if ingredient['id'] not in current
+            ],
+            recipe
+        )
+        return items, old_amounts, amounts
+
+    @staticmethod
+    def cache_relations(recipe, tags, items):
+        recipe._prefetched_objects_cache = {
+            'tags': tags,
+            'recipe_amount': items
+        }
 
     def create(self, validated_data):
         tags_data = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
+        image = validated_data.pop('image')
         validated_data.pop('author')
-        recipe = Recipe.objects.create(
+        recipe = Recipe(
             author=self.context.get('request').user,
-            image=validated_data.pop('image'),
             cooking_time=validated_data.pop('cooking_time'),
             **validated_data
         )
+        assign_image(recipe, image)
+        recipe.save()
+        enqueue_image(recipe, image)
 
-        self.add_ingredients(ingredients_data, recipe)
-        self.add_tags(tags_data, recipe)
+        items = self.add_ingredients(ingredients_data, recipe)
+        recipe.tags.add(*tags_data)
+        self.cache_relations(recipe, tags_data, items)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.tags.clear()
-        IngredientRecipe.objects.filter(recipe=instance).delete()
-        self.add_tags(
-            validated_data.pop('tags'),
-            instance
-        )
-        self.add_ingredients(
-            validated_data.pop('ingredients'),
-            instance
-        )
-        return super().update(
+        image = validated_data.pop('image', None)
+        old_image = instance.image.name
+        if image is not None:
+            assign_image(instance, image)
+        tags_data = validated_data.pop('tags', None)
+        if tags_data is not None:
+            instance.tags.set(tags_data)
+        ingredients_data = validated_data.pop('ingredients', None)
+        items = None
+        if ingredients_data is not None:
+            items, old_amounts, amounts = self.update_ingredients(
+                ingredients_data,
+                instance
+            )
+            ShoppingListItem.objects.change_recipe(
+                instance.id,
+                old_amounts,
+                amounts
+            )
+        instance = super().update(
             instance,
             validated_data
         )
+        if tags_data is not None and items is not None:
+            self.cache_relations(instance, tags_data, items)
+        if image is not None:
+            enqueue_image(instance, image, old_image)
+        return instance
 
     def to_representation(self, instance):
+        request = self.context.get('request')
+        recipes = Recipe.objects.select_related('author')
+        relations = getattr(instance, '_prefetched_objects_cache', {})
+        if 'tags' in relations and 'recipe_amount' in relations:
+            instance = recipes.get(pk=instance.pk)
+            instance._prefetched_objects_cache = relations
+        else:
+            instance = recipes.with_read_relations().get(pk=instance.pk)
         return RecipeReadSerializer(
             instance,
             context={
-                'request': self.context.get('request')
+                'request': request
             }).data
 
 
 class RecipeReadSerializer(ModelSerializer):
     image = SerializerMethodField()
+    images = ImageVariantsField()
     tags = TagSerializer(
         many=True,
         read_only=True)
@@ -202,27 +286,19 @@ class RecipeReadSerializer(ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'images',
+            'image_status',
             'text',
             'cooking_time'
         )
 
     def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Recipe.objects.filter(
-            favorite__user=user,
-            id=obj.id
-        ).exists()
+        return obj.id in user_relations(self.context['request']).favorites
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Purchase.objects.filter(
-            user=self.context.get('request').user,
-            recipe=obj
-        ).exists()
+        return obj.id in user_relations(self.context['request']).cart
 
     def get_image(self, obj):
+        if obj.image_status != Recipe.IMAGE_READY or not obj.image:
+            return None
         return obj.image.url
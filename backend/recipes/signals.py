@@ -0,0 +1,72 @@
+from django.db import connections, transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_save
+)
+from django.dispatch import receiver
+
+from recipes.catalog import (
+    FEED_VERSION_KEY,
+    INGREDIENTS_VERSION_KEY,
+    TAGS_VERSION_KEY,
+    bump_version,
+    install_tag_index
+)
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from recipes.search import install_search_schema
+from users.models import User
+
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredients_changed(**kwargs):
+    bump_version(INGREDIENTS_VERSION_KEY)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tags_changed(**kwargs):
+    bump_version(TAGS_VERSION_KEY)
+    feed_changed()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def feed_changed(**kwargs):
+    transaction.on_commit(lambda: bump_version(FEED_VERSION_KEY))
+
+
+@receiver(pre_save, sender=User)
+def check_author(instance, update_fields=None, **kwargs):
+    instance._author_changed = False
+    if instance.pk is None or (
+            update_fields is not None
+            and not set(update_fields).intersection(AUTHOR_FIELDS)):
+        return
+    old = User.objects.filter(pk=instance.pk).values_list(
+        *AUTHOR_FIELDS
+    ).first()
+    instance._author_changed = old is not None and old != tuple(
+        getattr(instance, field) for field in AUTHOR_FIELDS
+    ) and instance.recipes.exists()
+
+
+@receiver(post_save, sender=User)
+def author_changed(instance, **kwargs):
+    if getattr(instance, '_author_changed', False):
+        feed_changed()
+
+
+@receiver(post_migrate)
+def create_schema_extras(sender, using, **kwargs):
+    if sender.name == 'recipes':
+        install_search_schema(connections[using])
+        install_tag_index(connections[using])
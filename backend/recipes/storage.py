@@ -0,0 +1,59 @@
+import fcntl
+import os
+import posixpath
+import re
+import tempfile
+import zlib
+from contextlib import contextmanager
+from hashlib import sha256
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+LOCKS_DIR = '.locks'
+CONTENT_NAME = re.compile(r'[0-9a-f]{64}\.[a-z0-9]+')
+LOCK_STRIPES = 64
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    @contextmanager
+    def lock(self, name):
+        directory = self.path(LOCKS_DIR)
+        os.makedirs(directory, exist_ok=True)
+        stripe = zlib.crc32(posixpath.basename(name).encode()) % LOCK_STRIPES
+        with open(os.path.join(directory, f'{stripe}.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _save(self, name, content):
+        digest = sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        name = posixpath.join(
+            posixpath.dirname(name),
+            digest.hexdigest() + posixpath.splitext(name)[1].lower()
+        )
+        path = self.path(name)
+        with self.lock(name):
+            if self.exists(name):
+                os.utime(path)
+                return name
+            directory = os.path.dirname(path)
+            os.makedirs(
+                directory,
+                mode=self.directory_permissions_mode or 0o777,
+                exist_ok=True
+            )
+            descriptor, temporary = tempfile.mkstemp(
+                dir=directory,
+                suffix='.tmp'
+            )
+            with os.fdopen(descriptor, 'wb') as output:
+                for chunk in content.chunks():
+                    output.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporary, self.file_permissions_mode)
+            os.replace(temporary, path)
+        return name
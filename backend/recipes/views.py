@@ -1,16 +1,32 @@
-from django.db.models.expressions import Exists, OuterRef
-from django_filters.rest_framework import DjangoFilterBackend
+import posixpath
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.http import FileResponse, Http404
 from django.shortcuts import get_object_or_404
-from rest_framework.filters import SearchFilter
+from PIL import UnidentifiedImageError
 from rest_framework import status
 from rest_framework.permissions import AllowAny, SAFE_METHODS
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from api.models import Favorite, Purchase
-from recipes.filters import IngredientFilter, RecipeFilter
+from api.counters import change_counter
+from api.models import ShoppingListItem
+from recipes.catalog import (
+    INGREDIENTS_VERSION_KEY,
+    TAGS_VERSION_KEY,
+    get_tag_ids
+)
+from recipes.filters import (
+    IngredientFilter,
+    RecipeOrderingFilter,
+    RecipeSearchFilter
+)
+from recipes.images import IMAGE_VARIANTS, ensure_variant, release_image
+from recipes.ingredient_index import ingredient_index, normalize
+from recipes.mixins import AnonymousPageCacheMixin, VersionedCatalogMixin
 from recipes.models import Ingredient, Recipe, Tag
-from recipes.pagination import LimitPageNumberPagination
+from recipes.pagination import RecipePagination
 from recipes.permissions import IsAuthorAdminModeratorOrReadOnly
 from recipes.serializers import (
     IngredientSerializer,
@@ -18,30 +34,68 @@ from recipes.serializers import (
     RecipeWriteSerializer,
     TagSerializer
 )
+from recipes.storage import CONTENT_NAME
+from users.models import User
+
+
+def image_variant(request, variant, name):
+    if variant not in IMAGE_VARIANTS or not CONTENT_NAME.fullmatch(name):
+        raise Http404
+    storage = Recipe.image.field.storage
+    original = posixpath.join(Recipe.image.field.upload_to, name)
+    try:
+        if not storage.exists(original):
+            raise Http404
+        return FileResponse(
+            storage.open(ensure_variant(original, variant))
+        )
+    except (
+        FileNotFoundError,
+        SuspiciousFileOperation,
+        UnidentifiedImageError
+    ):
+        raise Http404
 
 
-class TagsViewSet(ReadOnlyModelViewSet):
+class TagsViewSet(VersionedCatalogMixin, ReadOnlyModelViewSet):
     permission_classes = (AllowAny, )
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    version_key = TAGS_VERSION_KEY
 
 
-class IngredientsViewSet(ReadOnlyModelViewSet):
+class IngredientsViewSet(VersionedCatalogMixin, ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny, )
     filter_backends = [IngredientFilter]
-    search_fields = ('^name', )
     pagination_class = None
+    version_key = INGREDIENTS_VERSION_KEY
+
+    def get_search_params(self, request):
+        try:
+            limit = int(request.query_params['limit'])
+        except (KeyError, ValueError):
+            limit = None
+        return normalize(
+            request.query_params.get(IngredientFilter.search_param, '')
+        ), limit
+
+    def get_cache_variant(self, request):
+        return '{}:{}'.format(*self.get_search_params(request))
 
+    def get_catalog_data(self, request):
+        return ingredient_index.search(*self.get_search_params(request))
 
-class RecipeViewSet(ModelViewSet):
-    pagination_class = LimitPageNumberPagination
+
+class RecipeViewSet(AnonymousPageCacheMixin, ModelViewSet):
+    pagination_class = RecipePagination
     queryset = Recipe.objects.all()
-    search_fields = ['name']
-    filter_backends = (SearchFilter, DjangoFilterBackend)
-    filter_class = RecipeFilter
+    filter_backends = (
+        RecipeSearchFilter,
+        RecipeOrderingFilter
+    )
     permission_classes = [IsAuthorAdminModeratorOrReadOnly, ]
 
     def get_serializer_class(self):
@@ -50,33 +104,43 @@ class RecipeViewSet(ModelViewSet):
         return RecipeWriteSerializer
 
     def get_queryset(self):
-        queryset = Recipe.objects.all()
-        slug = self.request.query_params.get('tags')
-        if slug is not None:
-            queryset = queryset.filter(tags__slug=slug)
+        queryset = Recipe.objects.with_read_relations()
+        slugs = self.request.query_params.getlist('tags')
+        if slugs:
+            queryset = queryset.with_tags(get_tag_ids(slugs))
         author = self.request.query_params.get('author')
         if author is not None:
             queryset = queryset.filter(author__id=author)
-        user = self.request.user
-        if user.is_anonymous:
+        if self.request.user.is_anonymous:
             return queryset
-        queryset_filtered = queryset.annotate(
-            is_favorited=Exists(Favorite.objects.filter(
-                user=user, recipe_id=OuterRef('id')
-            )),
-            is_in_shopping_cart=Exists(Purchase.objects.filter(
-                user=user, recipe_id=OuterRef('id')
-            ))
-        )
         if self.request.GET.get('is_favorited'):
-            return queryset_filtered.filter(is_favorited=True)
+            return queryset.with_user_flags(self.request.user).filter(
+                is_favorited=True
+            )
         elif self.request.GET.get('is_in_shopping_cart'):
-            return queryset_filtered.filter(is_in_shopping_cart=True)
+            return queryset.with_user_flags(self.request.user).filter(
+                is_in_shopping_cart=True
+            )
         return queryset
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            ShoppingListItem.objects.delete_recipe(instance.id)
+            change_counter(
+                User.objects.filter(id=instance.author_id), 'recipes_count', -1
+            )
+            instance.delete()
+            release_image(instance.image.name)
+
     def perform_create(self, serializer):
         serializer.is_valid()
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            serializer.save(author=self.request.user)
+            change_counter(
+                User.objects.filter(id=self.request.user.id),
+                'recipes_count',
+                1
+            )
 
     def delete(self, request, recipe):
         user = request.user
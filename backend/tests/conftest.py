@@ -0,0 +1,68 @@
+import pytest
+from django.core.cache import cache
+
+from api.models import Favorite, Purchase
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from users.models import User
+
+RECIPES = 8
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(
+        email='reader@example.com',
+        username='reader',
+        first_name='Иван',
+        last_name='Иванов',
+        password='password'
+    )
+
+
+@pytest.fixture
+def recipes(user):
+    authors = [
+        User.objects.create_user(
+            email=f'author{index}@example.com',
+            username=f'author{index}',
+            first_name='Автор',
+            last_name=str(index),
+            password='password'
+        )
+        for index in range(RECIPES)
+    ]
+    tags = [
+        Tag.objects.create(name=f'Тег {index}', color='#00000' + str(index),
+                           slug=f'tag{index}')
+        for index in range(3)
+    ]
+    ingredients = [
+        Ingredient.objects.create(
+            name=f'Ингредиент {index}',
+            measurement_unit=Ingredient.GRAM
+        )
+        for index in range(5)
+    ]
+    recipes = []
+    for index, author in enumerate(authors):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {index}',
+            image='recipes/test.png',
+            text='Описание',
+            cooking_time=10
+        )
+        recipe.tags.set(tags[:index % 3 + 1])
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in ingredients[:index % 5 + 1]
+        )
+        recipes.append(recipe)
+    Favorite.objects.create(user=user, recipe=recipes[0])
+    Purchase.objects.create(user=user, recipe=recipes[1])
+    return recipes
@@ -0,0 +1,52 @@
+from io import BytesIO
+
+import pytest
+from django.test import Client, override_settings
+from PIL import Image
+
+from recipes.images import IMAGE_VARIANTS
+
+DIGEST = 'a' * 64
+URL = '/media/recipes/variants/{variant}/{name}'
+
+
+@pytest.fixture
+def media(tmp_path):
+    (tmp_path / 'recipes').mkdir()
+    with override_settings(MEDIA_ROOT=tmp_path):
+        yield tmp_path / 'recipes'
+
+
+def get_variant(name, variant='thumb'):
+    return Client().get(URL.format(variant=variant, name=name))
+
+
+def test_variant_is_built_from_stored_image(media):
+    image = BytesIO()
+    Image.new('RGB', (640, 480)).save(image, 'PNG')
+    (media / f'{DIGEST}.png').write_bytes(image.getvalue())
+    response = get_variant(f'{DIGEST}.png')
+    assert response.status_code == 200
+    with Image.open(BytesIO(b''.join(response.streaming_content))) as variant:
+        assert max(variant.size) == IMAGE_VARIANTS['thumb']
+
+
+@pytest.mark.parametrize('name', [
+    'image.png',
+    f'{DIGEST}.png.png',
+    f'{DIGEST.upper()}.png',
+    f'{DIGEST[1:]}.png',
+    f'..{DIGEST}.png',
+])
+def test_names_outside_content_hash_pattern_give_404(media, name):
+    (media / name).write_bytes(b'')
+    assert get_variant(name).status_code == 404
+
+
+def test_missing_image_gives_404(media):
+    assert get_variant(f'{DIGEST}.png').status_code == 404
+
+
+def test_broken_image_gives_404(media):
+    (media / f'{DIGEST}.png').write_bytes(b'not an image')
+    assert get_variant(f'{DIGEST}.png').status_code == 404
@@ -0,0 +1,37 @@
+import pytest
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+HOSTS = ['one.example.com', 'two.example.com']
+
+
+@pytest.mark.django_db
+@override_settings(ALLOWED_HOSTS=HOSTS)
+def test_anonymous_page_cache_is_keyed_by_host_and_scheme(recipes):
+    client = APIClient()
+    for host in HOSTS:
+        for secure in (False, True):
+            response = client.get(
+                '/api/recipes/', {'limit': 1}, HTTP_HOST=host, secure=secure
+            )
+            assert response['X-Cache'] == 'MISS'
+            scheme = 'https' if secure else 'http'
+            assert response.json()['next'].startswith(f'{scheme}://{host}/')
+    response = client.get('/api/recipes/', {'limit': 1}, HTTP_HOST=HOSTS[0])
+    assert response['X-Cache'] == 'HIT'
+    assert response.json()['next'].startswith(f'http://{HOSTS[0]}/')
+
+
+@pytest.mark.django_db
+def test_cached_page_keeps_vary_and_etag_headers(recipes):
+    client = APIClient()
+    miss = client.get('/api/recipes/')
+    hit = client.get('/api/recipes/')
+    assert (miss['X-Cache'], hit['X-Cache']) == ('MISS', 'HIT')
+    for response in (miss, hit):
+        vary = {value.strip() for value in response['Vary'].split(',')}
+        assert {'Accept', 'Authorization'} <= vary
+        assert response['ETag'] == miss['ETag']
+    response = client.get('/api/recipes/', HTTP_IF_NONE_MATCH=miss['ETag'])
+    assert response.status_code == 304
+    assert response['ETag'] == miss['ETag']
@@ -0,0 +1,170 @@
+import re
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import override_settings
+
+from api.models import Favorite, Purchase, ShoppingListItem, Subscriber
+from recipes.catalog import get_tag_ids
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from recipes.pagination import PAGE_SIZE
+from users.models import User
+
+LARGE_TABLES = (
+    'recipes_recipe',
+    'recipes_recipe_tags',
+    'recipes_ingredientrecipe',
+    'api_favorite',
+    'api_purchase',
+    'api_subscriber',
+    'api_shoppinglistitem',
+    'users_user',
+)
+DATASET = {
+    'postgresql': {'users': 1000, 'recipes': 10000},
+    'sqlite': {'users': 200, 'recipes': 2000},
+}
+SEQUENTIAL_SCAN = re.compile(r'Seq Scan on (\w+)')
+SQLITE_SCAN = re.compile(r'\bSCAN (\w+)')
+SQLITE_INDEX = re.compile(
+    r'\bSEARCH \w+ USING (?:COVERING INDEX|INDEX|INTEGER PRIMARY KEY)'
+)
+FEED_SCAN = ('recipes_recipe', )
+
+on_postgresql = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Планы с Seq Scan проверяются только на PostgreSQL'
+)
+on_sqlite = pytest.mark.skipif(
+    connection.vendor != 'sqlite',
+    reason='Проверка EXPLAIN QUERY PLAN для SQLite'
+)
+
+
+def feed_by_tags(user):
+    slugs = list(Tag.objects.values_list('slug', flat=True)[:2])
+    return Recipe.objects.with_tags(get_tag_ids(slugs))[:PAGE_SIZE]
+
+
+def feed_favorited(user):
+    return Recipe.objects.with_user_flags(user).filter(
+        is_favorited=True
+    )[:PAGE_SIZE]
+
+
+def feed_in_cart(user):
+    return Recipe.objects.with_user_flags(user).filter(
+        is_in_shopping_cart=True
+    )[:PAGE_SIZE]
+
+
+def recipe_ingredients(user):
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True)[:PAGE_SIZE])
+    return IngredientRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).select_related('ingredient')
+
+
+def user_favorites(user):
+    return Favorite.objects.filter(user=user).order_by('-id')[:PAGE_SIZE]
+
+
+def user_purchases(user):
+    return Purchase.objects.filter(user=user).order_by('-pub_date')
+
+
+def recipe_purchasers(user):
+    recipe_id = Purchase.objects.values_list('recipe_id', flat=True).first()
+    return Purchase.objects.filter(recipe_id=recipe_id).order_by()
+
+
+def followers(user):
+    return Subscriber.objects.filter(author=user)
+
+
+def is_subscribed(user):
+    author = Subscriber.objects.values_list('author_id', flat=True).first()
+    return Subscriber.objects.filter(user=user, author_id=author)
+
+
+def subscriptions(user):
+    return User.objects.filter(author__user=user).order_by('username')
+
+
+def shopping_list(user):
+    return ShoppingListItem.objects.filter(user=user)
+
+
+SHAPES = {
+    'recipes-list:tags': (feed_by_tags, FEED_SCAN),
+    'recipes-list:favorited': (feed_favorited, FEED_SCAN),
+    'recipes-list:cart': (feed_in_cart, FEED_SCAN),
+    'recipes-list:ingredients': (recipe_ingredients, ()),
+    'favorites:user': (user_favorites, ()),
+    'purchases:user': (user_purchases, ()),
+    'purchases:recipe': (recipe_purchasers, ()),
+    'subscribers:author': (followers, ()),
+    'subscribers:is-subscribed': (is_subscribed, ()),
+    'subscriptions': (subscriptions, ()),
+    'download': (shopping_list, ()),
+}
+
+
+@pytest.fixture(scope='module')
+def dataset(django_db_setup, django_db_blocker, tmp_path_factory):
+    media = tmp_path_factory.mktemp('media')
+    with django_db_blocker.unblock(), override_settings(MEDIA_ROOT=media):
+        with transaction.atomic():
+            Ingredient.objects.bulk_create(
+                Ingredient(
+                    name=f'Ингредиент {index}',
+                    measurement_unit=Ingredient.GRAM
+                )
+                for index in range(100)
+            )
+            call_command(
+                'generate_data',
+                ingredients_per_recipe=5,
+                stdout=StringIO(),
+                **DATASET[connection.vendor]
+            )
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    for table in LARGE_TABLES:
+                        cursor.execute(f'ANALYZE {table}')
+            yield User.objects.filter(
+                id=Favorite.objects.values('user_id')[:1]
+            ).get()
+            transaction.set_rollback(True)
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+def test_query_has_no_distinct_or_duplicates(dataset, shape):
+    queryset = SHAPES[shape][0](dataset)
+    ids = list(queryset.values_list('id', flat=True))
+    assert 'DISTINCT' not in str(queryset.query)
+    assert len(ids) == len(set(ids))
+
+
+@on_sqlite
+@pytest.mark.parametrize('shape', SHAPES)
+def test_sqlite_plan_uses_indexes(dataset, shape):
+    make_queryset, allowed_scans = SHAPES[shape]
+    plan = make_queryset(dataset).explain()
+    assert SQLITE_INDEX.search(plan), plan
+    assert not [
+        table for table in SQLITE_SCAN.findall(plan)
+        if table in LARGE_TABLES and table not in allowed_scans
+    ], plan
+
+
+@on_postgresql
+@pytest.mark.parametrize('shape', SHAPES)
+def test_postgresql_plan_has_no_sequential_scans(dataset, shape):
+    plan = SHAPES[shape][0](dataset).explain()
+    assert not [
+        table for table in SEQUENTIAL_SCAN.findall(plan)
+        if table in LARGE_TABLES
+    ], plan
@@ -0,0 +1,47 @@
+import pytest
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from tests.conftest import RECIPES
+
+AUTHENTICATED_QUERIES = 8
+AUTHENTICATED_CACHED_RELATIONS_QUERIES = 5
+ANONYMOUS_MISS_QUERIES = 4
+ANONYMOUS_HIT_QUERIES = 0
+
+
+def get_recipes(client, limit):
+    response = client.get('/api/recipes/', {'limit': limit})
+    assert response.status_code == 200
+    assert len(response.json()['results']) == limit
+    return response
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}'
+    )
+    return client
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('limit', [1, RECIPES])
+def test_recipe_list_queries(django_assert_num_queries, client, recipes,
+                             limit):
+    with django_assert_num_queries(AUTHENTICATED_QUERIES):
+        get_recipes(client, limit)
+    with django_assert_num_queries(AUTHENTICATED_CACHED_RELATIONS_QUERIES):
+        get_recipes(client, limit)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('limit', [1, RECIPES])
+def test_anonymous_recipe_list_queries(django_assert_num_queries, recipes,
+                                       limit):
+    client = APIClient()
+    with django_assert_num_queries(ANONYMOUS_MISS_QUERIES):
+        assert get_recipes(client, limit)['X-Cache'] == 'MISS'
+    with django_assert_num_queries(ANONYMOUS_HIT_QUERIES):
+        assert get_recipes(client, limit)['X-Cache'] == 'HIT'
@@ -0,0 +1,20 @@
+import pytest
+from django.core.cache import cache
+
+from api.models import Favorite
+from api.relations import FAVORITES, cache_key, load_ids
+
+
+@pytest.mark.django_db
+def test_invalidation_hides_ids_cached_by_a_concurrent_reader(
+    django_capture_on_commit_callbacks, user, recipes
+):
+    assert list(load_ids(FAVORITES, user.id)) == [recipes[0].id]
+    stale_key = cache_key(FAVORITES, user.id)
+    stale = load_ids(FAVORITES, user.id).tobytes()
+    with django_capture_on_commit_callbacks(execute=True):
+        Favorite.objects.create(user=user, recipe=recipes[2])
+    cache.set(stale_key, stale)
+    assert list(load_ids(FAVORITES, user.id)) == sorted(
+        [recipes[0].id, recipes[2].id]
+    )
@@ -0,0 +1,44 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.catalog import get_tag_ids
+from recipes.models import Recipe
+
+SLUGS = ['tag0', 'tag1', 'tag2']
+
+
+def distinct_count(slugs):
+    return Recipe.objects.filter(tags__slug__in=slugs).distinct().count()
+
+
+@pytest.mark.django_db
+def test_with_tags_has_no_distinct_or_duplicates(recipes):
+    queryset = Recipe.objects.with_tags(get_tag_ids(SLUGS))
+    ids = list(queryset.values_list('id', flat=True))
+    assert 'DISTINCT' not in str(queryset.query)
+    assert len(ids) == len(set(ids))
+    assert len(ids) == distinct_count(SLUGS)
+    assert Recipe.objects.filter(tags__slug__in=SLUGS).count() > len(ids)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('slugs', [SLUGS[:1], SLUGS[:2], SLUGS])
+def test_recipe_list_filters_by_several_tags(recipes, slugs):
+    with CaptureQueriesContext(connection) as queries:
+        response = APIClient().get(
+            '/api/recipes/', {'tags': slugs, 'limit': len(recipes)}
+        )
+    assert response.status_code == 200
+    ids = [recipe['id'] for recipe in response.json()['results']]
+    assert len(ids) == len(set(ids))
+    assert response.json()['count'] == len(ids) == distinct_count(slugs)
+    assert not any('DISTINCT' in query['sql'] for query in queries)
+
+
+@pytest.mark.django_db
+def test_unknown_tags_give_empty_result(recipes):
+    response = APIClient().get('/api/recipes/', {'tags': ['missing']})
+    assert response.status_code == 200
+    assert response.json()['count'] == 0
@@ -36,6 +36,16 @@ class User(AbstractUser):
         max_length=150,
         null=False
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
 
     class Meta:
         ordering = ('username',)
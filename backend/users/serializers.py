@@ -2,7 +2,7 @@ from django.contrib.auth import get_user_model
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 
-from api.models import Subscriber
+from api.relations import user_relations
 
 User = get_user_model()
 
@@ -34,10 +34,4 @@ class SpecialUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        if user.is_anonymous:
-            return False
-        return Subscriber.objects.filter(
-            user=user,
-            author=obj
-        ).exists()
+        return obj.id in user_relations(self.context['request']).following